@@ -0,0 +1,115 @@
+import argparse
+import csv
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+import pymysql
+from loguru import logger
+
+from benchmarks.standin import StandInConnection
+from benchmarks.write_behind import gen_frames
+from financial_data.backend.db.bulk import bulk_upsert_data, write_tsv
+from financial_data.backend.db.db import upsert_data
+
+TABLE = 'TaiwanStockPrice'
+CREATE_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'create_table.sql')
+
+
+def show_create_table(table: str) -> str:
+    # the create_table.sql statement as SHOW CREATE TABLE prints it, partitioning inside a version comment
+    with open(CREATE_TABLE_PATH, encoding='utf-8') as f:
+        statements = f.read().split('CREATE TABLE ')
+    sql = next(statement for statement in statements if statement.startswith(f'`financial_data`.`{table}`'))
+    sql = f'CREATE TABLE {sql.strip()}'.replace(f'`financial_data`.`{table}`', f'`{table}`')
+    columns, _, partitions = sql.partition('\nPARTITION BY ')
+    if not partitions:
+        return f'{columns} ENGINE=InnoDB DEFAULT CHARSET=utf8mb4'
+    return f'{columns} ENGINE=InnoDB DEFAULT CHARSET=utf8mb4\n/*!50500 PARTITION BY {partitions} */'
+
+
+class Result:
+    def __init__(self, rows: list[tuple] = (), rowcount: int = 0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class PartitionedConnection:
+    # answers the statements of bulk_upsert_data the way MySQL does against the partitioned fact tables
+    def __init__(self):
+        self.statements = []
+        self.loaded = 0
+
+    def exec_driver_sql(self, sql: str, parameters=None) -> Result:
+        self.statements.append(sql)
+        if sql.startswith('SHOW CREATE TABLE'):
+            table = sql.split('`')[1]
+            return Result(rows=[(table, show_create_table(table))])
+        if sql.startswith('CREATE TEMPORARY TABLE') and (' LIKE ' in sql or 'PARTITION' in sql):
+            raise pymysql.err.OperationalError(1562, 'Cannot create temporary table with partitions')
+        if sql.startswith('LOAD DATA LOCAL INFILE'):
+            path = re.match(r"LOAD DATA LOCAL INFILE '([^']*)'", sql).group(1)
+            with open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE, escapechar='\\'))
+            self.loaded = len(rows)
+            return Result(rowcount=len(rows))
+        if sql.startswith('INSERT INTO'):
+            return Result(rowcount=self.loaded)
+        return Result()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def check_partitioned(df: pd.DataFrame):
+    # the bulk path must load into a staging table the partitioned schema allows, not fall over on 1562
+    conn = PartitionedConnection()
+    loaded = bulk_upsert_data(df=df, table=TABLE, mysql_conn=conn)
+    assert loaded == len(df), (loaded, len(df))
+    create = next(sql for sql in conn.statements if sql.startswith('CREATE TEMPORARY TABLE'))
+    assert 'PRIMARY KEY' in create and 'PARTITION' not in create, create
+
+
+def time_upsert(df: pd.DataFrame) -> tuple[float, int]:
+    conn = StandInConnection()
+    start = time.perf_counter()
+    upsert_data(df=df, table=TABLE, mysql_conn=conn)
+    return time.perf_counter() - start, sum(conn.statements)
+
+
+def time_tsv(df: pd.DataFrame) -> tuple[float, int]:
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8') as f:
+        start = time.perf_counter()
+        write_tsv(df=df, f=f)
+        return time.perf_counter() - start, f.tell()
+
+
+def main():
+    # client side only: building escaped INSERT statements against writing the file LOAD DATA reads,
+    # the server side of both paths needs a MySQL server and is not measured here
+    parser = argparse.ArgumentParser(description='client cost of the batched upsert against the LOAD DATA file')
+    parser.add_argument('--days', type=int, default=250, help='TPEX days of about --rows rows, one backfill year')
+    parser.add_argument('--rows', type=int, default=1000)
+    args = parser.parse_args()
+    logger.disable('financial_data')
+
+    df = pd.concat(gen_frames(tasks=args.days, rows=args.rows), ignore_index=True)
+    check_partitioned(df.head(10000))
+    print(f'{"path":<10} {"seconds":>8} {"rows/sec":>11} {"bytes":>12}')
+    for path, (elapsed, size) in [('upsert', time_upsert(df)), ('tsv', time_tsv(df))]:
+        print(f'{path:<10} {elapsed:>8.2f} {len(df) / elapsed:>11,.0f} {size:>12,}')
+
+
+if __name__ == '__main__':
+    main()
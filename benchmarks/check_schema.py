@@ -0,0 +1,53 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from financial_data.schema.dataset import apply_dtype_plan, check_schema, check_schema_by_row
+
+
+def gen_stock_price_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = rng.uniform(5, 1000, rows).round(2)
+    return pd.DataFrame(
+        {
+            'StockID': [f'{1101 + i}' for i in range(rows)],
+            'TradeVolume': rng.integers(0, 10**8, rows).astype(str),
+            'Transaction': rng.integers(0, 10**5, rows).astype(str),
+            'TradeValue': rng.integers(0, 10**11, rows).astype(str),
+            'Open': close.astype(str),
+            'Max': (close * 1.02).round(2).astype(str),
+            'Min': (close * 0.98).round(2).astype(str),
+            'Close': close.astype(str),
+            'Change': rng.uniform(-10, 10, rows).round(2).astype(str),
+            'date': '2023-08-01',
+        }
+    )
+
+
+def timeit(func, df: pd.DataFrame, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df=df.copy(), dataset='TaiwanStockPrice')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows: int = 20000, repeat: int = 5):
+    df = gen_stock_price_frame(rows=rows)
+    expected = apply_dtype_plan(check_schema_by_row(df=df.copy(), dataset='TaiwanStockPrice'), 'TaiwanStockPrice')
+    result = check_schema(df=df.copy(), dataset='TaiwanStockPrice')
+    pd.testing.assert_frame_equal(result, expected)
+
+    by_row = timeit(check_schema_by_row, df, repeat)
+    columnar = timeit(check_schema, df, repeat)
+    print(f'rows={rows}')
+    print(f'check_schema_by_row: {by_row * 1000:.1f} ms ({rows / by_row:,.0f} rows/sec)')
+    print(f'check_schema:        {columnar * 1000:.1f} ms ({rows / columnar:,.0f} rows/sec)')
+    print(f'speedup: {by_row / columnar:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
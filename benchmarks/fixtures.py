@@ -0,0 +1,138 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+import numpy as np
+
+from financial_data.crawler.taiwan_stock_price import get_tpex_url, get_twse_url
+from financial_data.crawler.taiwan_futures_daily import get_futures_url
+
+# recorded payloads dropped here as <source>.<ext>.gz take precedence over generated ones,
+# e.g. copied from the raw response cache (CRAWLER_CACHE_DIR)
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+TWSE_FIELDS = [
+    '證券代號', '證券名稱', '成交股數', '成交筆數', '成交金額', '開盤價', '最高價', '最低價',
+    '收盤價', '漲跌(+/-)', '漲跌價差', '最後揭示買價', '最後揭示買量', '最後揭示賣價',
+    '最後揭示賣量', '本益比',
+]
+TWSE_DIR = ['<p style= color:red>+</p>', '<p style= color:green>-</p>', '<p> </p>', '<p>X</p>']
+TAIFEX_FIELDS = [
+    '交易日期', '契約', '到期月份(週別)', '開盤價', '最高價', '最低價', '收盤價', '漲跌價', '漲跌%',
+    '成交量', '結算價', '未沖銷契約數', '最後最佳買價', '最後最佳賣價', '歷史最高價', '歷史最低價',
+    '是否因訊息面暫停交易', '交易時段', '價差對單式委託成交量',
+]
+EXT = dict(twse='json', tpex='json', taifex='csv')
+
+
+def _prices(rng: np.random.Generator, rows: int) -> tuple[np.ndarray, ...]:
+    close = rng.uniform(5, 1000, rows).round(2)
+    return close, (close * 1.01).round(2), (close * 1.03).round(2), (close * 0.97).round(2)
+
+
+def _fmt(values: np.ndarray, spec: str) -> list[str]:
+    return [format(v, spec) for v in values.tolist()]
+
+
+def twse_payload(rows: int, date: str, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    close, open_, high, low = _prices(rng, rows)
+    columns = [
+        [f'{1101 + i}' for i in range(rows)],
+        [f'股票{i}' for i in range(rows)],
+        _fmt(rng.integers(0, 10**8, rows), ','),
+        _fmt(rng.integers(0, 10**5, rows), ','),
+        _fmt(rng.integers(0, 10**11, rows), ','),
+        _fmt(open_, ',.2f'),
+        _fmt(high, ',.2f'),
+        _fmt(low, ',.2f'),
+        _fmt(close, ',.2f'),
+        rng.choice(TWSE_DIR, rows).tolist(),
+        _fmt(rng.uniform(0, 10, rows), '.2f'),
+        _fmt(close, ',.2f'),
+        _fmt(rng.integers(0, 10**3, rows), ','),
+        _fmt(close, ',.2f'),
+        _fmt(rng.integers(0, 10**3, rows), ','),
+        _fmt(rng.uniform(0, 50, rows), '.2f'),
+    ]
+    # untraded stocks show dashes instead of prices
+    for col in (5, 6, 7, 8):
+        for i in rng.choice(rows, rows // 50, replace=False):
+            columns[col][i] = '--'
+    data = [list(row) for row in zip(*columns)]
+    tables = [
+        dict(title=f'table {i}', fields=['指數', '收盤指數'], data=[['指數', '1,000.00']] * 20)
+        for i in range(8)
+    ]
+    tables.append(dict(title='每日收盤行情(全部)', fields=TWSE_FIELDS, data=data))
+    return json.dumps(
+        dict(stat='OK', date=date.replace('-', ''), tables=tables), ensure_ascii=False
+    ).encode('utf-8')
+
+
+def tpex_payload(rows: int, date: str, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    close, open_, high, low = _prices(rng, rows)
+    change = _fmt(rng.uniform(-10, 10, rows), '+.2f')
+    for i in rng.choice(rows, rows // 100, replace=False):
+        change[i] = '除息'
+    columns = [
+        [f'{3000 + i}' for i in range(rows)],
+        [f'上櫃{i}' for i in range(rows)],
+        _fmt(close, ',.2f'),
+        change,
+        _fmt(open_, ',.2f'),
+        _fmt(high, ',.2f'),
+        _fmt(low, ',.2f'),
+        _fmt(rng.integers(0, 10**8, rows), ','),
+        _fmt(rng.integers(0, 10**11, rows), ','),
+        _fmt(rng.integers(0, 10**5, rows), ','),
+    ] + [_fmt(close, ',.2f')] * 8
+    for col in (2, 4, 5, 6):
+        for i in rng.choice(rows, rows // 50, replace=False):
+            columns[col][i] = '----'
+    data = [list(row) for row in zip(*columns)]
+    return json.dumps(dict(reportDate=date, aaData=data), ensure_ascii=False).encode('utf-8')
+
+
+def taifex_payload(rows: int, date: str, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    close, open_, high, low = _prices(rng, rows)
+    change = rng.uniform(-50, 50, rows).round(0)
+    after_market = rng.random(rows) < 0.5
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TAIFEX_FIELDS)
+    for i in range(rows):
+        writer.writerow(
+            [
+                date.replace('-', '/'),
+                f'F{i % 200:03d}',
+                f'2023{(i // 200) % 12 + 1:02d}',
+                open_[i], high[i], low[i], close[i],
+                change[i],
+                f'{change[i] / close[i] * 100:.2f}%',
+                int(rng.integers(0, 10**5)),
+                '-' if after_market[i] else close[i],
+                '-' if after_market[i] else int(rng.integers(0, 10**5)),
+                close[i], close[i], high[i], low[i],
+                '',
+                '盤後' if after_market[i] else '一般',
+                0,
+            ]
+        )
+    return buffer.getvalue().encode('big5')
+
+
+GENERATORS = dict(twse=twse_payload, tpex=tpex_payload, taifex=taifex_payload)
+URLS = dict(twse=get_twse_url, tpex=get_tpex_url, taifex=get_futures_url)
+
+
+def load_payload(source: str, rows: int, date: str) -> bytes:
+    path = os.path.join(FIXTURE_DIR, f'{source}.{EXT[source]}.gz')
+    if os.path.exists(path):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    return GENERATORS[source](rows=rows, date=date)
@@ -0,0 +1,63 @@
+import argparse
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+TARGETS = ['financial_data.tasks.task', 'financial_data.producer', 'financial_data.api.main']
+DISPATCH = '''
+import time
+import financial_data.tasks.task
+from financial_data import registry
+start = time.perf_counter()
+for name in registry.DATASET_MODULES:
+    registry.get_dataset(name)
+first = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(1000):
+    for name in registry.DATASET_MODULES:
+        registry.get_dataset(name)
+print(first, (time.perf_counter() - start) / 1000 / len(registry.DATASET_MODULES))
+'''
+
+
+def import_time(module: str) -> tuple[float, dict[str, float]]:
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True
+    ).stderr
+    total = 0.0
+    packages = {}
+    for self_us, cumulative_us, indent, name in LINE.findall(output):
+        if name == module and not indent:
+            total = int(cumulative_us) / 1000
+            continue
+        # heaviest import per top-level package, the first time anything pulled it in
+        root = name.split('.')[0]
+        if root == 'financial_data':
+            continue
+        packages[root] = max(packages.get(root, 0.0), int(cumulative_us) / 1000)
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='import cost of the entry points and dataset dispatch')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for module in TARGETS:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        total, packages = min(runs, key=lambda run: run[0])
+        print(f'{module}: {total:.0f} ms')
+        for root, ms in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+            print(f'    {root:<24} {ms:8.1f} ms')
+
+    first, cached = subprocess.run(
+        [sys.executable, '-c', DISPATCH], capture_output=True, text=True, check=True
+    ).stdout.split()
+    print(f'dataset resolution without preload: {float(first) * 1000:.1f} ms on the first task of a process')
+    print(f'dataset resolution once loaded: {float(cached) * 1e6:.2f} us per task')
+
+
+if __name__ == '__main__':
+    main()
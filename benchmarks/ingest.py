@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from loguru import logger
+
+from benchmarks.fixtures import URLS, load_payload
+from benchmarks.standin import StandInConnection
+from financial_data.backend.db.db import upsert_data
+from financial_data.backend.http import cache
+from financial_data.backend.http.fetch import Response, fetch
+from financial_data.crawler import taiwan_stock_price
+from financial_data.schema.dataset import check_schema
+from financial_data.crawler import taiwan_futures_daily
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DATE = '2023-08-01'
+
+
+def stock_price_stages(source: str) -> list[tuple[str, callable]]:
+    parse = taiwan_stock_price.parse_twse if source == 'twse' else taiwan_stock_price.parse_tpex
+    return [
+        ('fetch', lambda _: fetch(url=URLS[source](date=DATE), headers={}, date=DATE)),
+        ('parse', lambda res: parse(res=res, date=DATE)),
+        ('clean', lambda df: taiwan_stock_price.clean(df=df, data_source=source)),
+        ('validate', lambda df: check_schema(df=df, dataset='TaiwanStockPrice')),
+        ('upload', lambda df: upsert_data(df=df, table='TaiwanStockPrice', mysql_conn=StandInConnection())),
+    ]
+
+
+def futures_stages() -> list[tuple[str, callable]]:
+    return [
+        ('fetch', lambda _: fetch(url=URLS['taifex'](date=DATE), headers={}, date=DATE)),
+        ('parse', lambda res: taiwan_futures_daily.parse_futures(res=res)),
+        ('clean', lambda df: taiwan_futures_daily.clean(df=df, date=DATE, end_date=DATE)),
+        ('validate', lambda df: check_schema(df=df, dataset='TaiwanFuturesDaily')),
+        ('upload', lambda df: upsert_data(df=df, table='TaiwanFuturesDaily', mysql_conn=StandInConnection())),
+    ]
+
+
+def check_futures_clean(payload: bytes):
+    # a lone '-' means no trade and becomes 0, every other value keeps its sign through clean
+    raw = taiwan_futures_daily.parse_futures(res=Response(url='', status=200, content=payload))
+    df = taiwan_futures_daily.clean(df=raw, date=DATE, end_date=DATE)
+    for zh, col in [('漲跌價', 'Change'), ('結算價', 'SettlementPrice')]:
+        expected = pd.to_numeric(raw[zh].astype(str).str.strip().replace('-', '0'), errors='coerce').fillna(0)
+        assert (df[col].to_numpy() == expected.to_numpy()).all(), f'taifex clean changed {col}'
+
+
+def copy_input(value):
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def run_pipeline(stages: list[tuple[str, callable]], repeat: int) -> dict[str, dict[str, float]]:
+    result = {}
+    value = None
+    for stage, func in stages:
+        best = float('inf')
+        for _ in range(repeat):
+            arg = copy_input(value)
+            start = time.perf_counter()
+            output = func(arg)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        func(copy_input(value))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = len(output) if isinstance(output, pd.DataFrame) else (output if isinstance(output, int) else 0)
+        result[stage] = dict(seconds=best, rows=rows, peak_mb=peak / 2**20)
+        value = output
+    # fetch and parse yield no row count of their own, report them against the parsed frame
+    rows = result['parse']['rows']
+    for stage in result.values():
+        stage['rows'] = stage['rows'] or rows
+        stage['rows_per_sec'] = stage['rows'] / stage['seconds'] if stage['seconds'] else 0.0
+    return result
+
+
+def report(results: dict[str, dict[str, dict[str, float]]]):
+    print(f'{"pipeline":<8} {"stage":<9} {"rows":>7} {"ms":>9} {"rows/sec":>12} {"peak MB":>8}')
+    for pipeline, stages in results.items():
+        for stage, r in stages.items():
+            print(
+                f'{pipeline:<8} {stage:<9} {r["rows"]:>7} {r["seconds"] * 1000:>9.1f} '
+                f'{r["rows_per_sec"]:>12,.0f} {r["peak_mb"]:>8.1f}'
+            )
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for pipeline, stages in results.items():
+        for stage, r in stages.items():
+            base = baseline.get(pipeline, {}).get(stage)
+            if base and r['rows_per_sec'] < base['rows_per_sec'] * (1 - threshold):
+                regressions.append(
+                    f'{pipeline}.{stage}: {r["rows_per_sec"]:,.0f} rows/sec, baseline {base["rows_per_sec"]:,.0f}'
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fetch -> parse -> clean -> validate -> upload benchmark')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed rows/sec drop against baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+    logger.disable('financial_data')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # fixtures are served from a throwaway raw cache in replay mode, nothing touches the network
+        cache.CRAWLER_CACHE_DIR = cache_dir
+        cache.set_replay(True)
+        for source in URLS:
+            cache.save(url=URLS[source](date=DATE), date=DATE, content=load_payload(source, args.rows, DATE))
+        check_futures_clean(load_payload('taifex', args.rows, DATE))
+        results = {
+            'twse': run_pipeline(stock_price_stages('twse'), args.repeat),
+            'tpex': run_pipeline(stock_price_stages('tpex'), args.repeat),
+            'taifex': run_pipeline(futures_stages(), args.repeat),
+        }
+    report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
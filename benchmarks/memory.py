@@ -0,0 +1,73 @@
+import argparse
+
+import pandas as pd
+from loguru import logger
+
+from benchmarks.fixtures import GENERATORS
+from financial_data.backend.http.fetch import Response
+from financial_data.crawler import taiwan_futures_daily, taiwan_stock_price
+from financial_data.schema.dataset import DTYPE_PLAN, check_schema
+
+
+def stock_price_frame(source: str, rows: int, date: str, seed: int) -> pd.DataFrame:
+    parse = taiwan_stock_price.parse_twse if source == 'twse' else taiwan_stock_price.parse_tpex
+    res = Response(url='', status=200, content=GENERATORS[source](rows=rows, date=date, seed=seed))
+    df = taiwan_stock_price.clean(df=parse(res=res, date=date), data_source=source)
+    return check_schema(df=df, dataset='TaiwanStockPrice')
+
+
+def futures_frame(rows: int, date: str, seed: int) -> pd.DataFrame:
+    res = Response(url='', status=200, content=GENERATORS['taifex'](rows=rows, date=date, seed=seed))
+    df = taiwan_futures_daily.clean(df=taiwan_futures_daily.parse_futures(res=res), date=date, end_date=date)
+    return check_schema(df=df, dataset='TaiwanFuturesDaily')
+
+
+def to_unplanned(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    # what frames looked like before the plan: python strings for ids and dates, float64 prices
+    df = df.copy()
+    for col, dtype in DTYPE_PLAN[dataset].items():
+        if dtype == 'category':
+            df[col] = df[col].astype(str).astype(object)
+        elif dtype.startswith('datetime64'):
+            df[col] = df[col].dt.strftime('%Y-%m-%d').astype(object)
+        elif dtype == 'float32':
+            df[col] = df[col].astype('float64')
+    return df
+
+
+def size_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def report(name: str, dataset: str, frames: list[pd.DataFrame]):
+    day = frames[0]
+    batch = pd.concat(frames, ignore_index=True)
+    rows = [
+        ('day', to_unplanned(day, dataset), day),
+        (f'{len(frames)} days', to_unplanned(batch, dataset), check_schema(df=batch, dataset=dataset)),
+    ]
+    for scope, before, after in rows:
+        print(
+            f'{name:<8} {scope:<8} {len(after):>9,} {size_mb(before):>10.2f} {size_mb(after):>10.2f}'
+            f' {size_mb(before) / size_mb(after):>7.1f}x'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='memory of validated frames with and without the dtype plan')
+    parser.add_argument('--rows', type=int, default=1000, help='rows per day')
+    parser.add_argument('--days', type=int, default=20, help='days in a batch')
+    args = parser.parse_args()
+    logger.disable('financial_data')
+
+    dates = [str(d.date()) for d in pd.bdate_range('2023-08-01', periods=args.days)]
+    print(f'{"source":<8} {"scope":<8} {"rows":>9} {"before MB":>10} {"after MB":>10} {"ratio":>8}')
+    for source in ('twse', 'tpex'):
+        frames = [stock_price_frame(source, args.rows, date, seed) for seed, date in enumerate(dates)]
+        report(source, 'TaiwanStockPrice', frames)
+    frames = [futures_frame(args.rows, date, seed) for seed, date in enumerate(dates)]
+    report('taifex', 'TaiwanFuturesDaily', frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from financial_data.schema.dataset import apply_dtype_plan
+
+TABLE = 'TaiwanStockPrice'
+
+
+def gen_long(years: int, stocks: int) -> pd.DataFrame:
+    # every stock on every business day, the shape of TaiwanStockPrice after a multi-year backfill
+    dates = pd.bdate_range('2015-01-01', periods=years * 250)
+    rng = np.random.default_rng(0)
+    close = rng.uniform(10, 500, size=len(dates) * stocks)
+    df = pd.DataFrame(
+        dict(
+            StockID=np.tile([f'{1000 + i}' for i in range(stocks)], len(dates)),
+            TradeVolume=rng.integers(1, 10**7, size=len(close)),
+            Transaction=rng.integers(1, 10**4, size=len(close)),
+            TradeValue=rng.integers(1, 10**9, size=len(close)),
+            Open=close,
+            Max=close,
+            Min=close,
+            Close=close,
+            Change=0.0,
+            date=np.repeat(dates, stocks),
+        )
+    )
+    return apply_dtype_plan(df=df, dataset=TABLE)
+
+
+def measure(func) -> tuple[float, float, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='close matrix from the long table against the panel store')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--stocks', type=int, default=1800)
+    args = parser.parse_args()
+    os.environ.setdefault('PANEL_DIR', tempfile.mkdtemp())
+    logger.disable('financial_data')
+    from financial_data.backend import panel
+
+    df = gen_long(years=args.years, stocks=args.stocks)
+    start_date, end_date = str(df['date'].min().date()), str(df['date'].max().date())
+    # one upload per day, as the crawler task appends
+    start = time.perf_counter()
+    for _, day_df in df.groupby('date', sort=True):
+        panel.upload_panel(df=day_df, table=TABLE, data_source='twse')
+    append = (time.perf_counter() - start) / df['date'].nunique()
+    print(f'{len(df):,} rows, {df["date"].nunique()} days x {args.stocks} stocks, append {append * 1000:.1f} ms/day')
+
+    print(f'{"read":<28} {"seconds":>8} {"peak MiB":>9}')
+    reads = [
+        ('pivot close', lambda: df.pivot(index='date', columns='StockID', values='Close')),
+        ('panel close', lambda: panel.read_panel(TABLE, 'Close', start_date, end_date)),
+        ('pivot one day', lambda: df[df['date'] == end_date].set_index('StockID')['Close']),
+        ('panel one day', lambda: panel.read_panel(TABLE, 'Close', end_date, end_date)),
+        ('pivot one stock', lambda: df[df['StockID'] == '1000'].set_index('date')['Close']),
+        ('panel one stock', lambda: panel.read_panel(TABLE, 'Close', start_date, end_date, stocks=['1000'])),
+    ]
+    for name, read in reads:
+        elapsed, peak, _ = measure(read)
+        print(f'{name:<28} {elapsed:>8.4f} {peak:>9.1f}')
+
+    expected = df.pivot(index='date', columns='StockID', values='Close')
+    actual = panel.read_panel(TABLE, 'Close', start_date, end_date)
+    assert np.array_equal(expected.to_numpy(), actual[expected.columns].to_numpy())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import math
+import tempfile
+
+import pandas as pd
+import pymysql
+from loguru import logger
+from prometheus_client import REGISTRY
+
+from benchmarks.standin import StandInConnection
+from benchmarks.write_behind import gen_frames
+from financial_data.backend.db import reject
+from financial_data.backend.db.db import upsert_data
+
+TABLE = 'TaiwanStockPrice'
+
+
+class RejectingConnection(StandInConnection):
+    # fails a whole batch, as MySQL does, when it carries one of the bad StockIDs
+    def __init__(self, bad: set[str]):
+        super().__init__()
+        self.bad = bad
+        self.calls = 0
+
+    def exec_driver_sql(self, sql: str, parameters=None):
+        self.calls += 1
+        for row in parameters or []:
+            if row[0] in self.bad:
+                raise pymysql.err.IntegrityError(1048, f"Column 'Close' cannot be null, StockID {row[0]}")
+        super().exec_driver_sql(sql, parameters)
+
+
+def reject_count() -> float:
+    return REGISTRY.get_sample_value(
+        'financial_data_rows_total', dict(dataset='', data_source='', stage='reject')
+    ) or 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bisecting upsert against a connection that rejects a few rows')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--bad', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    logger.disable('financial_data')
+
+    df = pd.concat(gen_frames(tasks=math.ceil(args.rows / 1000), rows=1000), ignore_index=True).head(args.rows)
+    df['StockID'] = [f'{i:06d}' for i in range(len(df))]
+    positions = [len(df) * (i + 1) // (args.bad + 1) for i in range(args.bad)]
+    bad = set(df['StockID'].iloc[positions])
+    conn = RejectingConnection(bad=bad)
+    before = reject_count()
+    with tempfile.TemporaryDirectory() as reject_dir:
+        reject.REJECT_DIR = reject_dir
+        written = upsert_data(df=df, table=TABLE, mysql_conn=conn, batch_size=args.batch_size)
+        with open(reject.get_reject_path(table=TABLE), encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+
+    assert written == len(df) - len(bad), written
+    assert sorted(line['row']['StockID'] for line in lines) == sorted(bad), lines
+    assert all(line['table'] == TABLE and 'cannot be null' in line['error'] for line in lines), lines
+    assert set(lines[0]['row']) == set(df.columns), lines[0]
+    assert reject_count() - before == len(bad)
+    # each bad row costs one failed statement per level of its batch's bisection, plus the halves that pass
+    batches = math.ceil(len(df) / args.batch_size)
+    bound = batches + len(bad) * 2 * math.ceil(math.log2(args.batch_size))
+    assert conn.calls <= bound, (conn.calls, bound)
+
+    print(f'rows={len(df)} bad={len(bad)} batch_size={args.batch_size}')
+    print(f'written={written} rejected={len(lines)} upserts={conn.calls} (bound {bound}, per-row {len(df)})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import time
+
+import pymysql
+from pymysql.cursors import Cursor
+
+
+class StandInCursor(Cursor):
+    # builds and escapes every statement exactly like pymysql, then drops it instead of sending it
+    def _query(self, q):
+        self.connection.statements.append(len(q))
+        if self.connection.latency:
+            time.sleep(self.connection.latency)
+        return 0
+
+
+class StandInConnection:
+    # the subset of sqlalchemy's Connection used by backend.db
+    # latency is slept per statement and per commit, a stand-in for the round trip and the log flush
+    def __init__(self, latency: float = 0.0):
+        self.dbapi_connection = pymysql.connections.Connection(defer_connect=True, charset='utf8mb4')
+        self.dbapi_connection.server_status = 0
+        self.dbapi_connection.statements = []
+        self.dbapi_connection.latency = latency
+        self.latency = latency
+        self.commits = 0
+
+    @property
+    def statements(self) -> list[int]:
+        return self.dbapi_connection.statements
+
+    def exec_driver_sql(self, sql: str, parameters=None):
+        cursor = StandInCursor(self.dbapi_connection)
+        if isinstance(parameters, list):
+            cursor.executemany(sql, parameters)
+        else:
+            cursor.execute(sql, parameters)
+
+    def commit(self):
+        self.commits += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def rollback(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
@@ -0,0 +1,88 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from loguru import logger
+
+from benchmarks.fixtures import GENERATORS
+from benchmarks.standin import StandInConnection
+from financial_data.backend.db.db import upsert_data
+from financial_data.backend.http.fetch import Response
+from financial_data.crawler import taiwan_stock_price
+from financial_data.schema.dataset import apply_dtype_plan, check_schema
+from financial_data.tasks.buffer import WriteBehindBuffer
+
+TABLE = 'TaiwanStockPrice'
+
+
+def gen_frames(tasks: int, rows: int) -> list[pd.DataFrame]:
+    res = Response(url='', status=200, content=GENERATORS['tpex'](rows=rows, date='2023-08-01'))
+    df = taiwan_stock_price.clean(df=taiwan_stock_price.parse_tpex(res=res, date='2023-08-01'), data_source='tpex')
+    df = check_schema(df=df, dataset=TABLE)
+    return [df for _ in range(tasks)]
+
+
+class Connections:
+    # one stand-in per upload, like a pooled connection checked out per task
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def upload(self, frames: list[tuple[dict, pd.DataFrame]], dataset: str, table: str) -> int:
+        conn = StandInConnection(latency=self.latency)
+        with self.lock:
+            self.opened.append(conn)
+        df = apply_dtype_plan(df=pd.concat([df for _, df in frames], ignore_index=True), dataset=table)
+        return upsert_data(df=df, table=table, mysql_conn=conn)
+
+    def totals(self) -> tuple[int, int]:
+        return sum(len(conn.statements) for conn in self.opened), sum(conn.commits for conn in self.opened)
+
+
+def per_task(frames: list[pd.DataFrame], concurrency: int, latency: float) -> tuple[float, Connections]:
+    connections = Connections(latency=latency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda df: connections.upload(frames=[({}, df)], dataset='', table=TABLE), frames))
+    return time.perf_counter() - start, connections
+
+
+def write_behind(
+    frames: list[pd.DataFrame], concurrency: int, latency: float, max_rows: int, interval: float
+) -> tuple[float, Connections]:
+    connections = Connections(latency=latency)
+    buffer = WriteBehindBuffer(upload=connections.upload, max_rows=max_rows, interval=interval, max_frames=concurrency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # each simulated task blocks until its frame is committed, as the crawler task does
+        list(pool.map(lambda df: buffer.add(dataset='', table=TABLE, parameter={}, df=df).result(), frames))
+    return time.perf_counter() - start, connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='per-task uploads against the write-behind buffer')
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=1000, help='rows per task, about one TPEX day')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads pool size of the worker')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds per statement and per commit')
+    parser.add_argument('--max-rows', type=int, default=50000)
+    parser.add_argument('--interval', type=float, default=0.2)
+    args = parser.parse_args()
+    logger.disable('financial_data')
+
+    frames = gen_frames(tasks=args.tasks, rows=args.rows)
+    total = args.tasks * args.rows
+    print(f'{"mode":<14} {"seconds":>8} {"rows/sec":>10} {"statements":>11} {"commits":>8}')
+    for mode, (elapsed, connections) in [
+        ('per-task', per_task(frames, args.concurrency, args.latency)),
+        ('write-behind', write_behind(frames, args.concurrency, args.latency, args.max_rows, args.interval)),
+    ]:
+        statements, commits = connections.totals()
+        print(f'{mode:<14} {elapsed:>8.2f} {total / elapsed:>10,.0f} {statements:>11} {commits:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,20 @@ CREATE TABLE `financial_data`.`TaiwanStockPrice` (
     `Close` FLOAT NOT NULL,
     `Change` FLOAT NOT NULL,
     `Date` DATE NOT NULL,
-    PRIMARY KEY(`StockID`, `Date`)
+    PRIMARY KEY(`StockID`, `Date`),
+    KEY `idx_date` (`Date`, `StockID`)
+)
+PARTITION BY RANGE COLUMNS(`Date`) (
+    PARTITION p2019 VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
 )
 
 CREATE TABLE `financial_data`.`TaiwanFuturesDaily` (
@@ -26,5 +39,27 @@ CREATE TABLE `financial_data`.`TaiwanFuturesDaily` (
     `SettlementPrice` FLOAT NOT NULL,
     `OpenInterest` INT NOT NULL,
     `TradingSession` VARCHAR(11) NOT NULL,
-    PRIMARY KEY(`FuturesID`, `Date`)
+    PRIMARY KEY(`FuturesID`, `Date`),
+    KEY `idx_date` (`Date`, `FuturesID`)
+)
+PARTITION BY RANGE COLUMNS(`Date`) (
+    PARTITION p2019 VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+)
+
+
+CREATE TABLE `financial_data`.`IngestCoverage` (
+    `Dataset` VARCHAR(50) NOT NULL,
+    `DataSource` VARCHAR(20) NOT NULL,
+    `Date` DATE NOT NULL,
+    `Rows` INT NOT NULL,
+    PRIMARY KEY(`Dataset`, `DataSource`, `Date`)
 )
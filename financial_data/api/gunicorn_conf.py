@@ -0,0 +1,8 @@
+# gunicorn -c financial_data/api/gunicorn_conf.py financial_data.api.main:app
+from financial_data.config import API_HOST, API_PORT, API_WORKERS
+
+bind = f'{API_HOST}:{API_PORT}'
+workers = API_WORKERS
+worker_class = 'uvicorn.workers.UvicornWorker'
+graceful_timeout = 30
+keepalive = 5
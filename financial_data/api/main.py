@@ -0,0 +1,57 @@
+import datetime
+import typing
+from financial_data.api.query import TABLES, iter_partitions, stream_arrow, stream_ndjson
+from financial_data.backend.query_cache import cache_key, get_query_cache
+from financial_data.config import API_HOST, API_PORT
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+
+app = FastAPI()
+
+MEDIA_TYPES = dict(
+    ndjson='application/x-ndjson',
+    arrow='application/vnd.apache.arrow.stream',
+)
+STREAMS = dict(
+    ndjson=stream_ndjson,
+    arrow=stream_arrow,
+)
+
+
+@app.get('/')
+def read_root():
+    return dict(datasets=list(TABLES))
+
+
+@app.get('/{dataset}')
+def read_dataset(
+    dataset: str,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    ids: typing.Optional[list[str]] = Query(None),
+    format: typing.Literal['ndjson', 'arrow'] = 'ndjson',
+):
+    if dataset not in TABLES:
+        raise HTTPException(status_code=404, detail=f'unknown dataset {dataset}')
+    if start_date > end_date:
+        raise HTTPException(status_code=422, detail='start_date is after end_date')
+    # a sync generator, starlette iterates it in the threadpool so the event loop is never blocked on MySQL
+    chunks = STREAMS[format](
+        table=dataset,
+        partitions=iter_partitions(table=dataset, ids=ids or [], start_date=start_date, end_date=end_date),
+    )
+    query_cache = get_query_cache()
+    if query_cache is not None:
+        key = cache_key(table=dataset, ids=ids or [], start_date=start_date, end_date=end_date, format=format)
+        payload = query_cache.get(key)
+        if payload is not None:
+            return Response(payload, media_type=MEDIA_TYPES[format])
+        chunks = query_cache.tee(key=key, token=query_cache.token(), chunks=chunks)
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
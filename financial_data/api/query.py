@@ -0,0 +1,105 @@
+import datetime
+import io
+import typing
+from financial_data.backend import db
+from financial_data.config import API_STREAM_ROWS
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import bindparam, text
+
+# column types follow create_table.sql, names follow the pydantic schema
+TABLES = {
+    'TaiwanStockPrice': dict(
+        id_column='StockID',
+        schema=pa.schema(
+            [
+                pa.field('StockID', pa.string()),
+                pa.field('TradeVolume', pa.int64()),
+                pa.field('Transaction', pa.int32()),
+                pa.field('TradeValue', pa.int64()),
+                pa.field('Open', pa.float32()),
+                pa.field('Max', pa.float32()),
+                pa.field('Min', pa.float32()),
+                pa.field('Close', pa.float32()),
+                pa.field('Change', pa.float32()),
+                pa.field('date', pa.date32()),
+            ]
+        ),
+    ),
+    'TaiwanFuturesDaily': dict(
+        id_column='FuturesID',
+        schema=pa.schema(
+            [
+                pa.field('FuturesID', pa.string()),
+                pa.field('ContractDate', pa.string()),
+                pa.field('Open', pa.float32()),
+                pa.field('Max', pa.float32()),
+                pa.field('Min', pa.float32()),
+                pa.field('Close', pa.float32()),
+                pa.field('Change', pa.float32()),
+                pa.field('ChangePer', pa.float32()),
+                pa.field('Volume', pa.float32()),
+                pa.field('SettlementPrice', pa.float32()),
+                pa.field('OpenInterest', pa.int32()),
+                pa.field('TradingSession', pa.string()),
+                pa.field('date', pa.date32()),
+            ]
+        ),
+    ),
+}
+
+
+def build_query_sql(table: str, ids: list[str]):
+    id_column = TABLES[table]['id_column']
+    colname = ', '.join(f'`{name}`' for name in TABLES[table]['schema'].names)
+    # the `Date` range prunes the yearly partitions, see backend/db/migration.py
+    sql = f'SELECT {colname} FROM `{table}` WHERE `Date` BETWEEN :start_date AND :end_date'
+    if ids:
+        # primary key (id, `Date`) order, each id's date range is read in index order
+        sql = f'{sql} AND `{id_column}` IN :ids ORDER BY `{id_column}`, `Date`'
+        return text(sql).bindparams(bindparam('ids', expanding=True))
+    # a cross-section reads the date range from idx_date (`Date`, id), ordered the same way to skip a filesort
+    return text(f'{sql} ORDER BY `Date`, `{id_column}`')
+
+
+def iter_partitions(
+    table: str, ids: list[str], start_date: datetime.date, end_date: datetime.date
+) -> typing.Iterator[list[tuple]]:
+    params = dict(start_date=start_date, end_date=end_date)
+    if ids:
+        params['ids'] = ids
+    # stream_results uses an unbuffered pymysql cursor, rows stay on the server until fetched
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        result = mysql_conn.execution_options(stream_results=True, yield_per=API_STREAM_ROWS).execute(
+            build_query_sql(table=table, ids=ids), params
+        )
+        for partition in result.partitions():
+            yield partition
+
+
+def stream_ndjson(table: str, partitions: typing.Iterable[list[tuple]]) -> typing.Iterator[bytes]:
+    names = TABLES[table]['schema'].names
+    for partition in partitions:
+        df = pd.DataFrame.from_records(partition, columns=names)
+        df['date'] = df['date'].astype(str)
+        yield df.to_json(orient='records', lines=True, force_ascii=False).encode('utf-8')
+
+
+def stream_arrow(table: str, partitions: typing.Iterable[list[tuple]]) -> typing.Iterator[bytes]:
+    schema = TABLES[table]['schema']
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for partition in partitions:
+        columns = list(zip(*partition))
+        writer.write_batch(
+            pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            )
+        )
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
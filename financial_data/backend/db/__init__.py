@@ -0,0 +1,5 @@
+from financial_data.backend.db.coverage import backfill_coverage, load_coverage, record_coverage
+from financial_data.backend.db.db import upload_data, upsert_data
+from financial_data.backend.db.router import Router
+
+router = Router()
@@ -0,0 +1,107 @@
+import contextlib
+import csv
+import re
+import tempfile
+import typing
+import pandas as pd
+import pymysql
+from loguru import logger
+from sqlalchemy import engine
+
+# client or server refused LOAD DATA LOCAL: local_infile off on either side
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+TSV_CHUNK_ROWS = 100000
+# SHOW CREATE TABLE wraps partitioning in a version comment, e.g. /*!50500 PARTITION BY RANGE COLUMNS(`Date`) ... */
+PARTITION_CLAUSE = re.compile(r'\s*(/\*!\d+\s*)?PARTITION BY ')
+
+
+def write_tsv(df: pd.DataFrame, f: typing.TextIO):
+    # LOAD DATA defaults: tab separated, backslash escaped, one row per line
+    # the csv writer backslash-escapes tabs, newlines and backslashes inside values, which LOAD DATA reads back
+    df.to_csv(
+        f,
+        sep='\t',
+        header=False,
+        index=False,
+        quoting=csv.QUOTE_NONE,
+        escapechar='\\',
+        lineterminator='\n',
+        date_format='%Y-%m-%d',
+        chunksize=TSV_CHUNK_ROWS,
+    )
+    f.flush()
+
+
+def build_load_sql(path: str, table: str, colname: list[str]) -> str:
+    columns = ','.join(f'`{col}`' for col in colname)
+    return (
+        f"LOAD DATA LOCAL INFILE '{pymysql.converters.escape_string(path)}' INTO TABLE `{table}` "
+        "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+        f"({columns})"
+    )
+
+
+def build_merge_sql(table: str, staging: str, colname: list[str]) -> str:
+    columns = ','.join(f'`{col}`' for col in colname)
+    update_sql = ','.join(f'`{col}` = VALUES(`{col}`)' for col in colname)
+    return f'INSERT INTO `{table}`({columns}) SELECT {columns} FROM `{staging}` ON DUPLICATE KEY UPDATE {update_sql}'
+
+
+def build_staging_sql(create_sql: str, table: str, staging: str) -> str:
+    # the target's columns and keys without its partitioning, MySQL refuses partitioned temporary tables
+    # (ER_PARTITION_NO_TEMPORARY, 1562), so CREATE TEMPORARY TABLE ... LIKE fails on the fact tables
+    create_sql = PARTITION_CLAUSE.split(create_sql, maxsplit=1)[0]
+    return create_sql.replace(f'CREATE TABLE `{table}`', f'CREATE TEMPORARY TABLE `{staging}`', 1)
+
+
+@contextlib.contextmanager
+def staging_table(table: str, mysql_conn: engine.base.Connection) -> typing.Iterator[str]:
+    # a temporary table lives on this connection only, drop it before the pool hands the connection out again
+    staging = f'{table}Staging'
+    _, create_sql = mysql_conn.exec_driver_sql(f'SHOW CREATE TABLE `{table}`').first()
+    mysql_conn.exec_driver_sql(f'DROP TEMPORARY TABLE IF EXISTS `{staging}`')
+    mysql_conn.exec_driver_sql(build_staging_sql(create_sql=create_sql, table=table, staging=staging))
+    try:
+        yield staging
+    finally:
+        try:
+            mysql_conn.exec_driver_sql(f'DROP TEMPORARY TABLE IF EXISTS `{staging}`')
+        except Exception as e:
+            logger.info(f'drop {staging} error: {e}')
+
+
+def is_local_infile_error(error: Exception) -> bool:
+    error = getattr(error, 'orig', error)
+    return isinstance(error, pymysql.err.MySQLError) and bool(error.args) and error.args[0] in LOCAL_INFILE_ERRORS
+
+
+def bulk_upsert_data(df: pd.DataFrame, table: str, mysql_conn: engine.base.Connection) -> typing.Optional[int]:
+    # None when the frame cannot go through LOAD DATA as is, the caller falls back to upsert_data
+    if df.isna().any().any():
+        # the csv writer would escape a \N null marker into a literal string
+        logger.info(f'bulk load {table}: frame has nulls, falling back to upsert')
+        return None
+    colname = list(df.columns)
+    with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8') as f:
+        write_tsv(df=df, f=f)
+        try:
+            with staging_table(table=table, mysql_conn=mysql_conn) as staging:
+                loaded = mysql_conn.exec_driver_sql(
+                    build_load_sql(path=f.name, table=staging, colname=colname)
+                ).rowcount
+                # LOCAL turns bad values and duplicate keys into warnings, let upsert_data reject those rows instead
+                warnings = list(mysql_conn.exec_driver_sql('SHOW WARNINGS LIMIT 5'))
+                if warnings:
+                    logger.info(f'bulk load {table}: {warnings}, falling back to upsert')
+                    mysql_conn.rollback()
+                    return None
+                mysql_conn.exec_driver_sql(build_merge_sql(table=table, staging=staging, colname=colname))
+                mysql_conn.commit()
+        except Exception as e:
+            mysql_conn.rollback()
+            if not is_local_infile_error(e):
+                raise
+            logger.info(f'bulk load {table} error: {e}, falling back to upsert')
+            return None
+    logger.info(f'bulk load {table} {loaded} rows')
+    return loaded
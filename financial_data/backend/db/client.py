@@ -1,11 +1,66 @@
-from financial_data.config import MYSQL_DATA_DATABASE, MYSQL_DATA_HOST, MYSQL_DATA_PASSWORD, MYSQL_DATA_PORT, MYSQL_DATA_USER
+import os
+from financial_data.config import (
+    MYSQL_DATA_DATABASE,
+    MYSQL_DATA_HOST,
+    MYSQL_DATA_PASSWORD,
+    MYSQL_DATA_PORT,
+    MYSQL_DATA_USER,
+    MYSQL_MAX_OVERFLOW,
+    MYSQL_POOL_PRE_PING,
+    MYSQL_POOL_RECYCLE,
+    MYSQL_POOL_SIZE,
+)
 from sqlalchemy import create_engine, engine
 
+_mysql_financial_data_engine = None
+_mysql_financial_data_bulk_engine = None
 
-def get_mysql_financial_data_conn() -> engine.base.Connection:
-    address = (
+
+def get_mysql_financial_data_address() -> str:
+    return (
         f'mysql+pymysql://{MYSQL_DATA_USER}:{MYSQL_DATA_PASSWORD}@{MYSQL_DATA_HOST}:{MYSQL_DATA_PORT}/{MYSQL_DATA_DATABASE}'
     )
-    engine = create_engine(address)
-    conn = engine.connect()
-    return conn
+
+
+def create_mysql_financial_data_engine(**connect_args) -> engine.Engine:
+    return create_engine(
+        get_mysql_financial_data_address(),
+        pool_size=MYSQL_POOL_SIZE,
+        max_overflow=MYSQL_MAX_OVERFLOW,
+        pool_recycle=MYSQL_POOL_RECYCLE,
+        pool_pre_ping=MYSQL_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def get_mysql_financial_data_engine() -> engine.Engine:
+    global _mysql_financial_data_engine
+    if _mysql_financial_data_engine is None:
+        _mysql_financial_data_engine = create_mysql_financial_data_engine()
+    return _mysql_financial_data_engine
+
+
+def get_mysql_financial_data_bulk_engine() -> engine.Engine:
+    # LOAD DATA LOCAL lets the server ask the client for a file, only bulk loads get connections that allow it
+    global _mysql_financial_data_bulk_engine
+    if _mysql_financial_data_bulk_engine is None:
+        _mysql_financial_data_bulk_engine = create_mysql_financial_data_engine(local_infile=True)
+    return _mysql_financial_data_bulk_engine
+
+
+def _dispose_after_fork():
+    # connections opened by the parent must not be shared with forked workers
+    for mysql_engine in [_mysql_financial_data_engine, _mysql_financial_data_bulk_engine]:
+        if mysql_engine is not None:
+            mysql_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def get_mysql_financial_data_conn() -> engine.base.Connection:
+    return get_mysql_financial_data_engine().connect()
+
+
+def get_mysql_financial_data_bulk_conn() -> engine.base.Connection:
+    return get_mysql_financial_data_bulk_engine().connect()
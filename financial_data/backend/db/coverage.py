@@ -0,0 +1,48 @@
+import pandas as pd
+from financial_data.backend.db.db import upsert_data
+from sqlalchemy import engine, text
+
+COVERAGE_TABLE = 'IngestCoverage'
+
+
+def record_coverage(df: pd.DataFrame, dataset: str, data_source: str, mysql_conn: engine.base.Connection):
+    if len(df) == 0:
+        return
+    counts = df.groupby('date').size()
+    coverage = pd.DataFrame(
+        {
+            'Dataset': dataset,
+            'DataSource': data_source,
+            'Date': counts.index.astype(str),
+            'Rows': counts.to_numpy(),
+        }
+    )
+    upsert_data(df=coverage, table=COVERAGE_TABLE, mysql_conn=mysql_conn)
+
+
+def load_coverage(
+    dataset: str, start_date: str, end_date: str, mysql_conn: engine.base.Connection
+) -> set[tuple[str, str]]:
+    sql = text(
+        f'SELECT `DataSource`, `Date` FROM `{COVERAGE_TABLE}` '
+        'WHERE `Dataset` = :dataset AND `Date` BETWEEN :start_date AND :end_date'
+    )
+    result = mysql_conn.execute(sql, dict(dataset=dataset, start_date=start_date, end_date=end_date))
+    return {(data_source, str(date)) for data_source, date in result}
+
+
+def build_backfill_sql(table: str) -> str:
+    # INSERT IGNORE keeps the counts already recorded by uploads, idx_date serves the GROUP BY
+    return (
+        f'INSERT IGNORE INTO `{COVERAGE_TABLE}`(`Dataset`, `DataSource`, `Date`, `Rows`) '
+        f'SELECT :dataset, :data_source, `Date`, COUNT(*) FROM `{table}` GROUP BY `Date`'
+    )
+
+
+def backfill_coverage(dataset: str, table: str, data_source: str, mysql_conn: engine.base.Connection) -> int:
+    # the fact tables do not record the exchange, every date with rows counts as covered for data_source
+    result = mysql_conn.execute(
+        text(build_backfill_sql(table=table)), dict(dataset=dataset, data_source=data_source)
+    )
+    mysql_conn.commit()
+    return result.rowcount
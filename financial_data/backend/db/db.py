@@ -1,89 +1,113 @@
 from loguru import logger
 import pandas as pd
 import pymysql
-from typing import Union
+import typing
 from sqlalchemy import engine
+from financial_data import metrics
+from financial_data.backend import query_cache
+from financial_data.backend.db.bulk import bulk_upsert_data
+from financial_data.backend.db.client import get_mysql_financial_data_bulk_conn
+from financial_data.backend.db.reject import write_rejects
+from financial_data.config import MYSQL_BULK_LOAD_ROWS, MYSQL_LOCAL_INFILE, MYSQL_UPSERT_BATCH_SIZE
 
-def update_mysql_by_pandas(df: pd.DataFrame, table: str, mysql_conn: engine.base.Connection):
-    if len(df) > 0:
-        try:
-            df.to_sql(
-                name=table,
-                con=mysql_conn,
-                if_exists='append',
-                index=False,
-                chunksize=1000,
-            )
-        except Exception as e:
-            pass
+def build_upsert_sql(table: str, colname: list[str]) -> str:
+    columns = ','.join(f'`{col}`' for col in colname)
+    values = ','.join(['%s'] * len(colname))
+    update_sql = ','.join(f'`{col}` = VALUES(`{col}`)' for col in colname)
+    return f'INSERT INTO `{table}`({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {update_sql}'
 
-def build_update_sql(colname: list[str], value: list[str]):
-    update_sql = ','.join(
-        [
-            ' `{}` = "{}" '.format(colname[i], str(value[i]))
-            for i in range(len(colname))
-            if str(value[i])
-        ]
+def df_to_rows(df: pd.DataFrame) -> list[tuple]:
+    # datetime64 columns go out as dates, categoricals and float32 become plain python values below
+    df = df.assign(
+        **{
+            col: df[col].dt.date
+            for col in df.columns
+            if pd.api.types.is_datetime64_any_dtype(df[col])
+        }
+    )
+    return list(
+        df.astype(object)
+        .where(df.notna(), None)
+        .itertuples(index=False, name=None)
     )
-    return update_sql
-
-def build_df_update_sql(table: str, df: pd.DataFrame) -> list[str]:
-    logger.info('build_df_update_sql')
-    df_columns = list(df.columns)
-    sql_list = []
-    for i in range(len(df)):
-        temp = list(df.iloc[i])
-        value = [
-            pymysql.converters.escape_string(str(v))
-            for v in temp
-        ]
-        sub_df_columns = [
-            df_columns[j]
-            for j in range(len(temp))
-        ]
-        update_sql = build_update_sql(
-            colname=sub_df_columns, value=value
-        )
-        sql = '''INSERT INTO `{}`({})VALUES ({}) ON DUPLICATE KEY UPDATE {}
-            '''.format(
-            table,
-            '`{}`'.format(
-                '`,`'.join(sub_df_columns)
-            ),
-            '"{}"'.format(
-                '"{}"'.join(value)
-            ),
-            update_sql,
-            )
-        sql_list.append(sql)
-    return sql_list
 
-def update_mysql_by_sql(df: pd.DataFrame, table: str, mysql_conn: engine.base.Connection):
-    sql = build_df_update_sql(table=table, df=df)
-    commit(sql=sql, mysql_conn=mysql_conn)
+def is_row_error(error: Exception) -> bool:
+    # errors caused by the values of some row, anything else (lost connection, bad sql) is not bisected
+    return isinstance(getattr(error, 'orig', error), (pymysql.err.DataError, pymysql.err.IntegrityError))
 
-def commit(sql: Union[str, list[str]], mysql_conn: engine.base.Connection = None):
-    logger.info('commit')
+def upsert_rows(
+    sql: str,
+    rows: list[tuple],
+    mysql_conn: engine.base.Connection,
+    rejects: list[tuple[tuple, Exception]],
+) -> int:
     try:
-        trans = mysql_conn.begin()
-        if isinstance(sql, list):
-            for s in sql:
-                try:
-                    mysql_conn.execution_options(autocommit=False).execute(s)
-                except Exception as e:
-                    logger.info(e)
-                    logger.info(s)
-                    break
-        elif isinstance(sql, str):
-            mysql_conn.execution_options(autocommit=False).execute(sql)
-        trans.commit()
+        # pymysql rewrites executemany on INSERT ... VALUES into multi-row statements
+        mysql_conn.exec_driver_sql(sql, rows)
+        mysql_conn.commit()
+        return len(rows)
     except Exception as e:
-        trans.rollback()
-        logger.info(e)
+        mysql_conn.rollback()
+        if not is_row_error(e):
+            raise
+        if len(rows) == 1:
+            rejects.append((rows[0], e))
+            return 0
+    # k bad rows cost about k * log2(len(rows)) extra statements, not one per row
+    middle = len(rows) // 2
+    return (
+        upsert_rows(sql=sql, rows=rows[:middle], mysql_conn=mysql_conn, rejects=rejects)
+        + upsert_rows(sql=sql, rows=rows[middle:], mysql_conn=mysql_conn, rejects=rejects)
+    )
 
-def upload_data(df: pd.DataFrame, table: str, mysql_conn: engine.base.Connection):
-    if len(df) > 0:
-        if update_mysql_by_pandas(df=df, table=table, mysql_conn=mysql_conn):
-            pass
-        else:
-            update_mysql_by_sql(df=df, table=table, mysql_conn=mysql_conn)
\ No newline at end of file
+def upsert_data(
+    df: pd.DataFrame,
+    table: str,
+    mysql_conn: engine.base.Connection,
+    batch_size: int = MYSQL_UPSERT_BATCH_SIZE,
+    rejects: typing.Optional[list[tuple[tuple, Exception]]] = None,
+) -> int:
+    # rejected rows are appended to `rejects` when the caller passes a list
+    if len(df) == 0:
+        return 0
+    colname = list(df.columns)
+    sql = build_upsert_sql(table=table, colname=colname)
+    rows = df_to_rows(df)
+    rejects = [] if rejects is None else rejects
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            written += upsert_rows(sql=sql, rows=batch, mysql_conn=mysql_conn, rejects=rejects)
+        except Exception as e:
+            logger.info(f'upsert {table} rows {start}-{start + len(batch)} error: {e}')
+            write_rejects(table=table, colname=colname, rejects=rejects)
+            raise
+    write_rejects(table=table, colname=colname, rejects=rejects)
+    metrics.count_rows(stage='reject', rows=len(rejects))
+    logger.info(f'upsert {table} {written} rows, {len(rejects)} rejected')
+    return written
+
+def drop_rejected(df: pd.DataFrame, rejects: list[tuple[tuple, Exception]]) -> pd.DataFrame:
+    if not rejects:
+        return df
+    rejected = {row for row, _ in rejects}
+    return df[[row not in rejected for row in df_to_rows(df)]]
+
+def upload_data(df: pd.DataFrame, table: str, mysql_conn: engine.base.Connection) -> pd.DataFrame:
+    # returns the rows MySQL accepted, without the ones written to the reject file
+    if len(df) == 0:
+        return df
+    # backfills go through LOAD DATA, anything it cannot take cleanly through the batched upsert
+    written = None
+    rejects = []
+    try:
+        if MYSQL_LOCAL_INFILE and len(df) >= MYSQL_BULK_LOAD_ROWS:
+            with get_mysql_financial_data_bulk_conn() as bulk_conn:
+                written = bulk_upsert_data(df=df, table=table, mysql_conn=bulk_conn)
+        if written is None:
+            upsert_data(df=df, table=table, mysql_conn=mysql_conn, rejects=rejects)
+    finally:
+        # batches committed before a failure are already visible, so the cached dates go either way
+        query_cache.invalidate(table=table, dates=df['date'].astype(str).unique())
+    return drop_rejected(df=df, rejects=rejects)
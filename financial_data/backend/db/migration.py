@@ -0,0 +1,143 @@
+import datetime
+import sys
+import typing
+from financial_data.backend.db.router import Router
+from financial_data.config import PARTITION_YEARS_AHEAD
+from loguru import logger
+from sqlalchemy import engine, text
+
+# fact tables and the id column that follows `Date` in the date-leading index
+FACT_TABLES = {
+    'TaiwanStockPrice': 'StockID',
+    'TaiwanFuturesDaily': 'FuturesID',
+}
+DATE_INDEX = 'idx_date'
+# catches rows past the last yearly partition, kept empty by extend
+MAX_PARTITION = 'pmax'
+
+
+def partition_name(year: int) -> str:
+    return f'p{year}'
+
+
+def build_partition_defs(years: typing.Iterable[int]) -> str:
+    # p2023 holds dates before 2024-01-01, the first partition also holds everything older
+    return ', '.join(
+        [f"PARTITION {partition_name(year)} VALUES LESS THAN ('{year + 1}-01-01')" for year in years]
+        + [f'PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)']
+    )
+
+
+def build_partition_sql(years: typing.Iterable[int]) -> str:
+    # RANGE COLUMNS on the bare column, so any `Date` comparison prunes without a YEAR() in the query
+    return f'PARTITION BY RANGE COLUMNS(`Date`) ({build_partition_defs(years)})'
+
+
+def get_partition_years(table: str, mysql_conn: engine.base.Connection) -> typing.Optional[list[int]]:
+    # None for an unpartitioned table, information_schema reports it as one unnamed partition
+    sql = text(
+        'SELECT `PARTITION_NAME` FROM information_schema.`PARTITIONS` '
+        'WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = :table ORDER BY `PARTITION_ORDINAL_POSITION`'
+    )
+    names = [name for name, in mysql_conn.execute(sql, dict(table=table))]
+    if not names or names[0] is None:
+        return None
+    return [int(name[1:]) for name in names if name != MAX_PARTITION]
+
+
+def has_date_index(table: str, mysql_conn: engine.base.Connection) -> bool:
+    sql = text(
+        'SELECT COUNT(*) FROM information_schema.`STATISTICS` '
+        'WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = :table AND `INDEX_NAME` = :index'
+    )
+    return mysql_conn.execute(sql, dict(table=table, index=DATE_INDEX)).scalar() > 0
+
+
+def get_last_year(until: typing.Optional[str] = None) -> int:
+    last_year = datetime.date.today().year + PARTITION_YEARS_AHEAD
+    if until:
+        last_year = max(last_year, datetime.date.fromisoformat(until).year)
+    return last_year
+
+
+def build_migrate_sql(table: str, mysql_conn: engine.base.Connection) -> typing.Optional[str]:
+    alter = []
+    if not has_date_index(table=table, mysql_conn=mysql_conn):
+        alter.append(f'ADD INDEX `{DATE_INDEX}` (`Date`, `{FACT_TABLES[table]}`)')
+    partition = ''
+    if get_partition_years(table=table, mysql_conn=mysql_conn) is None:
+        first_date = mysql_conn.exec_driver_sql(f'SELECT MIN(`Date`) FROM `{table}`').scalar()
+        first_year = first_date.year if first_date else datetime.date.today().year
+        partition = build_partition_sql(range(first_year, get_last_year() + 1))
+    if not alter and not partition:
+        return None
+    # one ALTER, so a large table is copied once for both the index and the partitioning
+    return ' '.join(part for part in [f'ALTER TABLE `{table}`', ', '.join(alter), partition] if part)
+
+
+def migrate(table: str, mysql_conn: engine.base.Connection):
+    sql = build_migrate_sql(table=table, mysql_conn=mysql_conn)
+    if sql is None:
+        logger.info(f'{table} is already partitioned and indexed')
+        return
+    # copies the table and blocks writes while it runs, schedule it outside crawling hours
+    logger.info(f'migrate {table}: {sql}')
+    mysql_conn.exec_driver_sql(sql)
+    mysql_conn.commit()
+
+
+def build_extend_sql(table: str, years: list[int], until: typing.Optional[str] = None) -> typing.Optional[str]:
+    first_year = max(years) + 1 if years else datetime.date.today().year
+    new_years = range(first_year, get_last_year(until=until) + 1)
+    if not new_years:
+        return None
+    # pmax is empty unless rows arrived past the last year, so splitting it moves little or nothing
+    return (
+        f'ALTER TABLE `{table}` REORGANIZE PARTITION {MAX_PARTITION} INTO ({build_partition_defs(new_years)})'
+    )
+
+
+def extend(table: str, mysql_conn: engine.base.Connection, until: typing.Optional[str] = None):
+    if table not in FACT_TABLES:
+        return
+    years = get_partition_years(table=table, mysql_conn=mysql_conn)
+    if years is None:
+        logger.info(f'{table} is not partitioned, run `python -m financial_data.backend.db.migration migrate`')
+        return
+    sql = build_extend_sql(table=table, years=years, until=until)
+    if sql is None:
+        return
+    logger.info(f'extend {table}: {sql}')
+    mysql_conn.exec_driver_sql(sql)
+    mysql_conn.commit()
+
+
+def explain(table: str, start_date: str, end_date: str, mysql_conn: engine.base.Connection) -> str:
+    # the partitions a date range read touches, e.g. `p2023,p2024` for a range inside those years
+    sql = text(f'EXPLAIN SELECT * FROM `{table}` WHERE `Date` BETWEEN :start_date AND :end_date')
+    row = mysql_conn.execute(sql, dict(start_date=start_date, end_date=end_date)).mappings().first()
+    return row['partitions']
+
+
+def main(command: str, tables: list[str]):
+    router = Router()
+    with router.mysql_financial_data_connect() as mysql_conn:
+        for table in tables or list(FACT_TABLES):
+            if command == 'migrate':
+                migrate(table=table, mysql_conn=mysql_conn)
+                extend(table=table, mysql_conn=mysql_conn)
+            elif command == 'extend':
+                extend(table=table, mysql_conn=mysql_conn)
+            else:
+                raise ValueError(f'unknown command {command}, expected migrate, extend or explain')
+
+
+if __name__ == '__main__':
+    # python -m financial_data.backend.db.migration migrate|extend [table ...]
+    # python -m financial_data.backend.db.migration explain table start_date end_date
+    if sys.argv[1] == 'explain':
+        table, start_date, end_date = sys.argv[2:5]
+        with Router().mysql_financial_data_connect() as mysql_conn:
+            logger.info(explain(table=table, start_date=start_date, end_date=end_date, mysql_conn=mysql_conn))
+    else:
+        main(command=sys.argv[1], tables=sys.argv[2:])
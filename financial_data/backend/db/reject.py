@@ -0,0 +1,35 @@
+import datetime
+import fcntl
+import json
+import os
+from financial_data.config import REJECT_DIR
+from loguru import logger
+
+
+def get_reject_path(table: str) -> str:
+    return os.path.join(REJECT_DIR, table, f'{datetime.date.today()}.jsonl')
+
+
+def write_rejects(table: str, colname: list[str], rejects: list[tuple[tuple, Exception]]):
+    if not rejects:
+        return
+    path = get_reject_path(table=table)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rejected_at = datetime.datetime.now().isoformat(timespec='seconds')
+    lines = [
+        json.dumps(
+            dict(
+                table=table,
+                rejected_at=rejected_at,
+                error=str(getattr(error, 'orig', error)),
+                row=dict(zip(colname, row)),
+            ),
+            ensure_ascii=False,
+            default=str,
+        )
+        for row, error in rejects
+    ]
+    with open(path, 'a', encoding='utf-8') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write('\n'.join(lines) + '\n')
+    logger.info(f'{table}: {len(rejects)} rows rejected, written to {path}')
@@ -1,15 +1,16 @@
 import time
 import typing
-from financial_data.backend.db.client import get_mysql_financial_data_conn
+from financial_data.backend.db.client import get_mysql_financial_data_conn, get_mysql_financial_data_engine
 
 from loguru import logger
 from sqlalchemy import engine
 
 def check_alive(connect: engine.base.Connection):
-    connect.execute('SELECT 1 + 1')
+    connect.exec_driver_sql('SELECT 1 + 1')
 
 
 def reconnect(connect_function: typing.Callable) -> engine.base.Connection:
+    connect = None
     try:
         connect = connect_function()
     except Exception as e:
@@ -34,10 +35,18 @@ def check_connect_alive(connect: engine.base.Connection, connect_function: typin
 
 class Router:
     def __init__(self) -> None:
-        self._mysql_financial_data_conn = get_mysql_financial_data_conn()
+        self._mysql_financial_data_conn = None
+
+    @property
+    def mysql_financial_data_engine(self) -> engine.Engine:
+        return get_mysql_financial_data_engine()
+
+    def mysql_financial_data_connect(self) -> engine.base.Connection:
+        # borrow a pooled connection, use as `with router.mysql_financial_data_connect() as conn:`
+        return self.mysql_financial_data_engine.connect()
 
     def check_mysql_financial_data_conn_alive(self):
-        self._mysql_financial_data_conn = check_connect_alive(connect=self._mysql_financial_data_conn, connect_function=get_mysql_financial_data_conn())
+        self._mysql_financial_data_conn = check_connect_alive(connect=self._mysql_financial_data_conn, connect_function=get_mysql_financial_data_conn)
         return self._mysql_financial_data_conn
     
     @property
@@ -45,4 +54,6 @@ class Router:
         return self.check_mysql_financial_data_conn_alive()
     
     def close_connection(self):
-        self._mysql_financial_data_conn.close()
\ No newline at end of file
+        if self._mysql_financial_data_conn is not None:
+            self._mysql_financial_data_conn.close()
+            self._mysql_financial_data_conn = None
@@ -0,0 +1,48 @@
+import datetime
+import gzip
+import hashlib
+import os
+import typing
+from urllib.parse import urlsplit
+from financial_data.config import CRAWLER_CACHE_DIR, CRAWLER_CACHE_ENABLED, CRAWLER_REPLAY
+
+# replay serves every request from the cache and never touches the network
+replay = CRAWLER_REPLAY
+
+
+def set_replay(enabled: bool):
+    global replay
+    replay = enabled
+
+
+def cache_key(url: str, date: str) -> str:
+    return hashlib.sha256(f'{url}\n{date}'.encode('utf-8')).hexdigest()
+
+
+def cache_path(url: str, date: str) -> str:
+    key = cache_key(url=url, date=date)
+    return os.path.join(CRAWLER_CACHE_DIR, urlsplit(url).netloc, key[:2], f'{key}.gz')
+
+
+def is_cacheable(date: str) -> bool:
+    # today's payload may still change, only settled dates are kept
+    return CRAWLER_CACHE_ENABLED and date < str(datetime.date.today())
+
+
+def load(url: str, date: str) -> typing.Optional[bytes]:
+    if not CRAWLER_CACHE_ENABLED and not replay:
+        return None
+    path = cache_path(url=url, date=date)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rb') as f:
+        return f.read()
+
+
+def save(url: str, date: str, content: bytes):
+    path = cache_path(url=url, date=date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with gzip.open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,42 @@
+import asyncio
+import typing
+from financial_data.config import CRAWLER_CONNECTIONS_PER_HOST, CRAWLER_TIMEOUT
+
+import requests
+
+if typing.TYPE_CHECKING:
+    import aiohttp
+
+# keyed by loop too, crawler_batch tasks on a threads pool each run their own loop
+_sessions: dict[tuple[asyncio.AbstractEventLoop, str], 'aiohttp.ClientSession'] = {}
+_sync_sessions: dict[str, requests.Session] = {}
+
+
+def get_session(host: str) -> 'aiohttp.ClientSession':
+    # one keep-alive session per host, must be called inside the running loop
+    # aiohttp costs ~80ms to import, processes that only crawl synchronously never load it
+    import aiohttp
+
+    key = (asyncio.get_running_loop(), host)
+    session = _sessions.get(key)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=CRAWLER_CONNECTIONS_PER_HOST),
+            timeout=aiohttp.ClientTimeout(total=CRAWLER_TIMEOUT),
+        )
+        _sessions[key] = session
+    return session
+
+
+def get_sync_session(host: str) -> requests.Session:
+    session = _sync_sessions.get(host)
+    if session is None:
+        session = requests.Session()
+        _sync_sessions[host] = session
+    return session
+
+
+async def close_sessions():
+    loop = asyncio.get_running_loop()
+    for key in [key for key in list(_sessions) if key[0] is loop]:
+        await _sessions.pop(key).close()
@@ -0,0 +1,119 @@
+import asyncio
+import dataclasses
+import typing
+from urllib.parse import urlsplit
+from financial_data import metrics
+from financial_data.backend.http import cache
+from financial_data.backend.http.client import close_sessions, get_session, get_sync_session
+from financial_data.backend.http.rate_limit import get_rate_limiter
+from financial_data.config import CRAWLER_TIMEOUT
+from loguru import logger
+
+import orjson
+
+
+@dataclasses.dataclass
+class Response:
+    url: str
+    status: int
+    content: bytes
+    _json: typing.Any = dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def json(self) -> typing.Any:
+        # parsed once, exchange payloads are large and callers may ask more than once
+        if self._json is None:
+            self._json = orjson.loads(self.content)
+        return self._json
+
+
+def load_cached(url: str, date: typing.Optional[str]) -> typing.Optional[Response]:
+    if date:
+        content = cache.load(url=url, date=date)
+        if content is not None:
+            return Response(url=url, status=200, content=content)
+    if cache.replay:
+        return Response(url=url, status=404, content=b'')
+    return None
+
+
+def is_json(res: Response) -> bool:
+    try:
+        res.json()
+    except ValueError:
+        return False
+    return True
+
+
+def save_cached(res: Response, date: typing.Optional[str], validate: typing.Optional[typing.Callable[[Response], bool]]):
+    # an error page served with status 200 is not kept, a replay would parse it as data for good
+    if date and res.ok and res.content and cache.is_cacheable(date=date):
+        if validate is None or validate(res):
+            cache.save(url=res.url, date=date, content=res.content)
+
+
+def fetch(
+    url: str,
+    headers: dict[str, str],
+    date: typing.Optional[str] = None,
+    validate: typing.Optional[typing.Callable[[Response], bool]] = None,
+) -> Response:
+    cached = load_cached(url=url, date=date)
+    if cached is not None:
+        return cached
+    host = urlsplit(url).netloc
+    metrics.observe(stage='rate_limit', seconds=get_rate_limiter(host).acquire())
+    with metrics.stage('download'):
+        res = get_sync_session(host).get(url=url, headers=headers, timeout=CRAWLER_TIMEOUT)
+        res = Response(url=url, status=res.status_code, content=res.content)
+    metrics.count_bytes(len(res.content))
+    save_cached(res=res, date=date, validate=validate)
+    return res
+
+
+async def fetch_async(
+    url: str,
+    headers: dict[str, str],
+    date: typing.Optional[str] = None,
+    validate: typing.Optional[typing.Callable[[Response], bool]] = None,
+) -> Response:
+    cached = load_cached(url=url, date=date)
+    if cached is not None:
+        return cached
+    host = urlsplit(url).netloc
+    metrics.observe(stage='rate_limit', seconds=await get_rate_limiter(host).acquire_async())
+    with metrics.stage('download'):
+        async with get_session(host).get(url, headers=headers) as res:
+            content = await res.read()
+            status = res.status
+    res = Response(url=url, status=status, content=content)
+    metrics.count_bytes(len(content))
+    save_cached(res=res, date=date, validate=validate)
+    return res
+
+
+def run(coroutines: list[typing.Coroutine]) -> list[typing.Union[typing.Any, BaseException]]:
+    # results in order, a coroutine that raised leaves its exception in its slot instead of failing the rest
+    async def gather():
+        try:
+            return await asyncio.gather(*coroutines, return_exceptions=True)
+        finally:
+            await close_sessions()
+    return asyncio.run(gather())
+
+
+def split_failed(
+    parameter_list: list[dict[str, str]], results: list
+) -> tuple[list[tuple[dict[str, str], typing.Any]], list[dict[str, str]]]:
+    # (parameter, result) of the parameters that succeeded, and the parameters that raised, like crawler_batch's failed
+    done, failed = [], []
+    for parameter, result in zip(parameter_list, results):
+        if isinstance(result, BaseException):
+            logger.info(f'{parameter} error: {result}')
+            failed.append(parameter)
+        else:
+            done.append((parameter, result))
+    return done, failed
@@ -0,0 +1,60 @@
+import asyncio
+import fcntl
+import os
+import time
+from financial_data.config import CRAWLER_RATE_LIMIT, CRAWLER_RATE_LIMIT_BURST, CRAWLER_RATE_LIMIT_DIR, CRAWLER_RATE_LIMIT_HOSTS
+
+
+class RateLimiter:
+    # token bucket kept in a locked file so every worker process on the node shares one budget per host
+    def __init__(self, host: str, rate: float, burst: float, directory: str = CRAWLER_RATE_LIMIT_DIR):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.path = os.path.join(directory, f'{host}.bucket')
+        os.makedirs(directory, exist_ok=True)
+
+    def reserve(self) -> float:
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            state = f.read().split()
+            now = time.time()
+            if len(state) == 2:
+                tokens, last = float(state[0]), float(state[1])
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+            else:
+                tokens = self.burst
+            # tokens may go negative, later callers queue up behind earlier reservations
+            tokens -= 1
+            f.seek(0)
+            f.truncate()
+            f.write(f'{tokens} {now}')
+        return max(0.0, -tokens / self.rate)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_limiters: dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(host: str) -> RateLimiter:
+    limiter = _limiters.get(host)
+    if limiter is None:
+        limiter = RateLimiter(
+            host=host,
+            rate=CRAWLER_RATE_LIMIT_HOSTS.get(host, CRAWLER_RATE_LIMIT),
+            burst=CRAWLER_RATE_LIMIT_BURST,
+        )
+        _limiters[host] = limiter
+    return limiter
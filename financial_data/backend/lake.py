@@ -0,0 +1,80 @@
+import os
+import typing
+from financial_data.config import DATA_LAKE_DIR
+from financial_data.schema.dataset import DTYPE_PLAN
+from loguru import logger
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+ARROW_TYPES = {
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'int64': pa.int64(),
+    'float32': pa.float32(),
+    'float64': pa.float64(),
+    'datetime64[ns]': pa.date32(),
+}
+
+
+def get_arrow_schema(table: str) -> pa.Schema:
+    # follows the dtype plan of the frames, so nothing is widened on the way to disk
+    return pa.schema(
+        [
+            pa.field(name, ARROW_TYPES[dtype], nullable=False)
+            for name, dtype in DTYPE_PLAN[table].items()
+        ]
+    )
+
+
+def get_partition_dir(table: str, data_source: str, date: str) -> str:
+    year, month, _ = date.split('-')
+    return os.path.join(
+        DATA_LAKE_DIR, f'dataset={table}', f'exchange={data_source}', f'year={int(year)}', f'month={int(month)}'
+    )
+
+
+def upload_parquet(df: pd.DataFrame, table: str, data_source: str):
+    if len(df) == 0:
+        return
+    schema = get_arrow_schema(table=table)
+    for date, day_df in df.groupby(df['date'].astype(str)):
+        day_df = day_df.assign(date=pd.to_datetime(day_df['date']).dt.date)
+        path = os.path.join(get_partition_dir(table=table, data_source=data_source, date=str(date)), f'{date}.parquet')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # one file per day, a re-ingest of that day replaces it
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        pq.write_table(
+            pa.Table.from_pandas(day_df[schema.names], schema=schema, preserve_index=False),
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+    logger.info(f'parquet {table} {data_source} {len(df)} rows')
+
+
+def read_parquet(
+    table: str,
+    start_date: str,
+    end_date: str,
+    data_source: typing.Optional[str] = None,
+    columns: typing.Optional[list[str]] = None,
+) -> pd.DataFrame:
+    dataset = ds.dataset(
+        os.path.join(DATA_LAKE_DIR, f'dataset={table}'),
+        format='parquet',
+        partitioning='hive',
+        exclude_invalid_files=True,
+    )
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    # year/month prune directories, date prunes row groups
+    condition = (
+        (ds.field('year') * 100 + ds.field('month') >= start.year * 100 + start.month)
+        & (ds.field('year') * 100 + ds.field('month') <= end.year * 100 + end.month)
+        & (ds.field('date') >= start.date())
+        & (ds.field('date') <= end.date())
+    )
+    if data_source:
+        condition = condition & (ds.field('exchange') == data_source)
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
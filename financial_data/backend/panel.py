@@ -0,0 +1,237 @@
+import contextlib
+import fcntl
+import json
+import os
+import typing
+from financial_data.config import PANEL_DAY_CHUNK, PANEL_DIR, PANEL_EPOCH, PANEL_STOCK_CAPACITY
+from financial_data.schema.dataset import DTYPE_PLAN
+from loguru import logger
+
+import numpy as np
+import pandas as pd
+
+# tables kept as date x id panels, futures have several contracts per id and date and are not one
+PANEL_TABLES = {
+    'TaiwanStockPrice': 'StockID',
+}
+# fill of cells never written: NaN for prices, 0 for counts, `present` tells a real 0 from a missing one
+FILL = {
+    'float32': np.nan,
+    'float64': np.nan,
+    'int64': 0,
+    'bool': False,
+}
+PRESENT = 'present'
+
+
+def get_panel_dir(table: str) -> str:
+    return os.path.join(PANEL_DIR, table)
+
+
+def get_fields(table: str) -> dict[str, str]:
+    id_column = PANEL_TABLES[table]
+    fields = {name: dtype for name, dtype in DTYPE_PLAN[table].items() if name not in (id_column, 'date')}
+    fields[PRESENT] = 'bool'
+    return fields
+
+
+def get_slots(dates: np.ndarray, epoch: str) -> np.ndarray:
+    # row of a date is its business-day count from the epoch, holidays keep an unwritten row
+    return np.busday_count(np.datetime64(epoch, 'D'), dates.astype('datetime64[D]'))
+
+
+def get_slot_dates(start: int, stop: int, epoch: str) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(np.busday_offset(np.datetime64(epoch, 'D'), np.arange(start, stop), roll='forward'))
+
+
+def load_meta(table: str) -> typing.Optional[dict]:
+    path = os.path.join(get_panel_dir(table=table), 'meta.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_meta(table: str, meta: dict):
+    # readers open the files of meta.json's version with its shape, so it is replaced only after they are written
+    path = os.path.join(get_panel_dir(table=table), 'meta.json')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def get_field_name(field: str, version: int) -> str:
+    return f'{field}.bin' if version == 0 else f'{field}.v{version}.bin'
+
+
+def get_field_version(name: str) -> typing.Optional[int]:
+    # Close.bin -> 0, Close.v3.bin -> 3, None for anything else in the directory
+    parts = name.split('.')
+    if parts[-1] != 'bin' or len(parts) not in (2, 3):
+        return None
+    return int(parts[1][1:]) if len(parts) == 3 else 0
+
+
+def get_field_path(table: str, field: str, meta: dict) -> str:
+    return os.path.join(get_panel_dir(table=table), get_field_name(field=field, version=meta.get('version', 0)))
+
+
+def open_field(table: str, field: str, meta: dict, mode: str = 'r') -> np.memmap:
+    return np.memmap(
+        get_field_path(table=table, field=field, meta=meta),
+        dtype=meta['fields'][field],
+        mode=mode,
+        shape=(meta['days'], meta['capacity']),
+    )
+
+
+def resize_field(table: str, field: str, meta: dict, new_meta: dict):
+    path = get_field_path(table=table, field=field, meta=meta)
+    new_path = get_field_path(table=table, field=field, meta=new_meta)
+    dtype = meta['fields'][field]
+    fill = FILL[dtype]
+    days, capacity = new_meta['days'], new_meta['capacity']
+    if new_path == path and os.path.exists(path):
+        # more days only: the file grows at its end, the stride is unchanged so readers of the old meta.json
+        # still read the rows they know about correctly
+        with open(path, 'r+b') as f:
+            f.truncate(days * capacity * np.dtype(dtype).itemsize)
+        array = np.memmap(path, dtype=dtype, mode='r+', shape=(days, capacity))
+        array[meta['days']:] = fill
+        array.flush()
+        return
+    # a wider row changes every offset, the copy goes to the next version's file so a reader that loaded the
+    # old meta.json keeps mapping the old file with the shape it was written with
+    array = np.memmap(new_path, dtype=dtype, mode='w+', shape=(days, capacity))
+    array[:] = fill
+    if os.path.exists(path):
+        array[:meta['days'], :meta['capacity']] = open_field(table=table, field=field, meta=meta)
+    array.flush()
+
+
+def remove_old_versions(table: str, meta: dict):
+    # the previous version stays for readers that loaded meta.json just before the rewrite, older ones go
+    version = meta.get('version', 0)
+    panel_dir = get_panel_dir(table=table)
+    for name in os.listdir(panel_dir):
+        old_version = get_field_version(name)
+        if old_version is not None and old_version < version - 1:
+            try:
+                os.remove(os.path.join(panel_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def grow(table: str, meta: dict, days: int, stocks: int) -> dict:
+    # headroom on both axes, a year of rows or half again the columns, so resizes stay rare
+    new_days = meta['days']
+    while new_days < days:
+        new_days += PANEL_DAY_CHUNK
+    new_capacity = meta['capacity']
+    while new_capacity < stocks:
+        new_capacity = max(int(new_capacity * 1.5), PANEL_STOCK_CAPACITY)
+    if (new_days, new_capacity) == (meta['days'], meta['capacity']):
+        return meta
+    logger.info(f'panel {table} resize {meta["days"]}x{meta["capacity"]} -> {new_days}x{new_capacity}')
+    version = meta.get('version', 0)
+    if new_capacity != meta['capacity'] and meta['capacity']:
+        version += 1
+    new_meta = dict(meta, days=new_days, capacity=new_capacity, version=version)
+    for field in meta['fields']:
+        resize_field(table=table, field=field, meta=meta, new_meta=new_meta)
+    return new_meta
+
+
+@contextlib.contextmanager
+def lock(table: str) -> typing.Iterator[None]:
+    # one writer at a time across worker processes, readers never take it
+    os.makedirs(get_panel_dir(table=table), exist_ok=True)
+    with open(os.path.join(get_panel_dir(table=table), 'lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def upload_panel(df: pd.DataFrame, table: str, data_source: str):
+    if len(df) == 0 or table not in PANEL_TABLES:
+        return
+    dates = pd.to_datetime(df['date']).to_numpy()
+    weekday = np.is_busday(dates.astype('datetime64[D]'))
+    if not weekday.all():
+        logger.info(f'panel {table} {data_source}: {(~weekday).sum()} weekend rows skipped')
+        df = df[weekday]
+        dates = dates[weekday]
+    ids = df[PANEL_TABLES[table]].astype(str).to_numpy()
+    with lock(table=table):
+        meta = load_meta(table=table) or dict(
+            epoch=PANEL_EPOCH, days=0, capacity=0, stocks=[], fields=get_fields(table=table), last_day=None
+        )
+        slots = get_slots(dates=dates, epoch=meta['epoch'])
+        if (slots < 0).any():
+            logger.info(f'panel {table} {data_source}: {(slots < 0).sum()} rows before {meta["epoch"]} skipped')
+            df, ids, dates, slots = df[slots >= 0], ids[slots >= 0], dates[slots >= 0], slots[slots >= 0]
+        if len(df) == 0:
+            return
+        # new ids take the next free columns, existing columns never move
+        columns = {stock_id: i for i, stock_id in enumerate(meta['stocks'])}
+        for stock_id in pd.unique(ids):
+            if stock_id not in columns:
+                columns[stock_id] = len(columns)
+        meta = grow(table=table, meta=meta, days=int(slots.max()) + 1, stocks=len(columns))
+        meta['stocks'] = list(columns)
+        cols = np.fromiter((columns[stock_id] for stock_id in ids), dtype=np.int64, count=len(ids))
+        for field, dtype in meta['fields'].items():
+            array = open_field(table=table, field=field, meta=meta, mode='r+')
+            array[slots, cols] = True if field == PRESENT else df[field].to_numpy(dtype=dtype)
+            array.flush()
+        last_day = str(dates.max().astype('datetime64[D]'))
+        meta['last_day'] = max(meta['last_day'] or last_day, last_day)
+        write_meta(table=table, meta=meta)
+        remove_old_versions(table=table, meta=meta)
+    logger.info(f'panel {table} {data_source} {len(df)} rows')
+
+
+def open_snapshot(table: str, field: str) -> tuple[typing.Optional[dict], typing.Optional[np.memmap]]:
+    # the files of a version are removed two capacity rewrites later, a reader that slept through both
+    # finds them gone and loads the current meta.json once more
+    for attempt in range(2):
+        meta = load_meta(table=table)
+        if meta is None:
+            return None, None
+        try:
+            return meta, open_field(table=table, field=field, meta=meta)
+        except FileNotFoundError:
+            if attempt:
+                raise
+
+
+def read_panel(
+    table: str,
+    field: str,
+    start_date: str,
+    end_date: str,
+    stocks: typing.Optional[list[str]] = None,
+) -> pd.DataFrame:
+    # dates x stocks; a date range with all stocks, or with a run of adjacent columns, is a view of the file
+    meta, array = open_snapshot(table=table, field=field)
+    if meta is None:
+        return pd.DataFrame()
+    start, stop = get_slots(dates=np.array([start_date, end_date], dtype='datetime64[D]'), epoch=meta['epoch'])
+    # an end date on a business day is included, busday_count stops before it
+    stop += np.is_busday(np.datetime64(end_date, 'D'))
+    start, stop = max(int(start), 0), min(int(stop), meta['days'])
+    array = array[start:stop]
+    if stocks is None:
+        columns = meta['stocks']
+        values = array[:, :len(columns)]
+    else:
+        index = {stock_id: i for i, stock_id in enumerate(meta['stocks'])}
+        columns = [stock_id for stock_id in stocks if stock_id in index]
+        cols = [index[stock_id] for stock_id in columns]
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            values = array[:, cols[0]:cols[0] + len(cols)]
+        else:
+            values = array[:, cols]
+    return pd.DataFrame(
+        values, index=get_slot_dates(start=start, stop=max(stop, start), epoch=meta['epoch']), columns=columns, copy=False
+    )
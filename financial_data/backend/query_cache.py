@@ -0,0 +1,273 @@
+import collections
+import fcntl
+import hashlib
+import os
+import threading
+import time
+import typing
+from financial_data.config import (
+    QUERY_CACHE_DIR,
+    QUERY_CACHE_DISK,
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_JOURNAL_MAX_BYTES,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_MAX_ENTRY_BYTES,
+    QUERY_CACHE_TTL,
+)
+
+# (table, ids, start_date, end_date, format), ids sorted and empty for every id
+CacheKey = tuple[str, tuple[str, ...], str, str, str]
+
+# invalidations kept in memory to decide whether a result computed before them may still be stored
+HISTORY_SIZE = 1024
+
+
+def cache_key(table: str, ids: list[str], start_date: str, end_date: str, format: str) -> CacheKey:
+    return (table, tuple(sorted(set(ids))), str(start_date), str(end_date), format)
+
+
+def is_affected(key: CacheKey, table: str, dates: typing.Iterable[str]) -> bool:
+    return key[0] == table and any(key[2] <= date <= key[3] for date in dates)
+
+
+def get_journal_path() -> str:
+    return os.path.join(QUERY_CACHE_DIR, 'invalidations.log')
+
+
+def get_entry_dir(table: str) -> str:
+    return os.path.join(QUERY_CACHE_DIR, 'entries', table)
+
+
+def get_entry_path(key: CacheKey) -> str:
+    digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+    # the date range is in the name so invalidation can find entries without opening them
+    return os.path.join(get_entry_dir(key[0]), f'{key[2]}_{key[3]}_{digest}.bin')
+
+
+def remove_disk_entries(table: str, dates: list[str]):
+    entry_dir = get_entry_dir(table)
+    if not os.path.isdir(entry_dir):
+        return
+    for name in os.listdir(entry_dir):
+        if name.endswith('.tmp'):
+            continue
+        start_date, end_date, _ = name.split('_', 2)
+        if any(start_date <= date <= end_date for date in dates):
+            try:
+                os.remove(os.path.join(entry_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def get_inode(path: str) -> typing.Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def open_journal() -> typing.TextIO:
+    # locked for append; a journal rotated while waiting for the lock is no longer at the path, reopen it
+    path = get_journal_path()
+    while True:
+        f = open(path, 'a')
+        fcntl.flock(f, fcntl.LOCK_EX)
+        if get_inode(path) == os.fstat(f.fileno()).st_ino:
+            return f
+        f.close()
+
+
+def rotate_journal():
+    # a new file under the same name, readers see the inode change and drop everything they cached
+    path = get_journal_path()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    open(tmp_path, 'w').close()
+    os.replace(tmp_path, path)
+
+
+def invalidate(table: str, dates: typing.Iterable[str]):
+    # called by writers after commit: journal first, then disk entries, readers evict memory on their next call
+    dates = sorted({str(date) for date in dates})
+    if not QUERY_CACHE_ENABLED or not dates:
+        return
+    os.makedirs(QUERY_CACHE_DIR, exist_ok=True)
+    with open_journal() as f:
+        f.write(f'{table}\t{",".join(dates)}\n')
+        f.flush()
+        # rotated under the lock, so no writer appends to the old file afterwards
+        if os.fstat(f.fileno()).st_size >= QUERY_CACHE_JOURNAL_MAX_BYTES:
+            rotate_journal()
+    remove_disk_entries(table=table, dates=dates)
+
+
+class QueryCache:
+    # LRU by bytes with TTL in memory, optionally backed by a disk tier shared on the node
+    def __init__(
+        self,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        ttl: float = QUERY_CACHE_TTL,
+        disk: bool = QUERY_CACHE_DISK,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = disk
+        self.entries: collections.OrderedDict[CacheKey, tuple[float, bytes]] = collections.OrderedDict()
+        self.size = 0
+        # tokens and history count journal bytes from `base`, so they keep growing across rotations;
+        # a token below `rotated` was taken before the last one
+        self.base = self.rotated = 0
+        self.history: collections.deque[tuple[int, str, list[str]]] = collections.deque(maxlen=HISTORY_SIZE)
+        self.lock = threading.Lock()
+        os.makedirs(QUERY_CACHE_DIR, exist_ok=True)
+        # created here so any later change of inode is a rotation; lines already in it are in the database
+        with open(get_journal_path(), 'a') as f:
+            stat = os.fstat(f.fileno())
+        self.offset, self.inode = stat.st_size, stat.st_ino
+
+    def rotate(self):
+        # lines appended to the old file since the last sync are lost to this process, so is all it cached
+        self.clear()
+        self.history.clear()
+        self.base += self.offset + 1
+        self.rotated = self.base
+        self.offset = 0
+
+    def sync(self):
+        path = get_journal_path()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if self.inode != stat.st_ino:
+            self.rotate()
+            self.inode = stat.st_ino
+        elif stat.st_size < self.offset:
+            # truncated in place, nothing is known about what changed
+            self.rotate()
+        if stat.st_size == self.offset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        # a line still being written is picked up next time
+        data = data[: data.rfind(b'\n') + 1]
+        for line in data.decode('utf-8').splitlines():
+            self.offset += len(line.encode('utf-8')) + 1
+            table, dates = line.split('\t')
+            dates = dates.split(',')
+            self.history.append((self.base + self.offset, table, dates))
+            for key in [key for key in self.entries if is_affected(key, table, dates)]:
+                self.evict(key)
+
+    def evict(self, key: CacheKey):
+        _, payload = self.entries.pop(key)
+        self.size -= len(payload)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def token(self) -> int:
+        # taken before running a query, passed back to put
+        with self.lock:
+            self.sync()
+            return self.base + self.offset
+
+    def is_stale(self, key: CacheKey, token: int) -> bool:
+        if token < self.rotated:
+            return True
+        if len(self.history) == self.history.maxlen and token < self.history[0][0]:
+            # invalidations newer than the token may have been dropped already
+            return True
+        return any(
+            offset > token and is_affected(key, table, dates)
+            for offset, table, dates in self.history
+        )
+
+    def get(self, key: CacheKey) -> typing.Optional[bytes]:
+        with self.lock:
+            self.sync()
+            entry = self.entries.get(key)
+            if entry is not None:
+                if time.time() - entry[0] < self.ttl:
+                    self.entries.move_to_end(key)
+                    return entry[1]
+                self.evict(key)
+        if self.disk:
+            return self.get_disk(key)
+        return None
+
+    def get_disk(self, key: CacheKey) -> typing.Optional[bytes]:
+        path = get_entry_path(key)
+        try:
+            created = os.path.getmtime(path)
+            if time.time() - created >= self.ttl:
+                return None
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        self.put_memory(key=key, payload=payload, created=created)
+        return payload
+
+    def put(self, key: CacheKey, payload: bytes, token: int):
+        if len(payload) > QUERY_CACHE_MAX_ENTRY_BYTES:
+            return
+        with self.lock:
+            self.sync()
+            # the query ran before a write to these dates landed
+            if self.is_stale(key, token):
+                return
+        self.put_memory(key=key, payload=payload, created=time.time())
+        if self.disk:
+            self.put_disk(key=key, payload=payload, token=token)
+
+    def put_memory(self, key: CacheKey, payload: bytes, created: float):
+        with self.lock:
+            if key in self.entries:
+                self.evict(key)
+            self.entries[key] = (created, payload)
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                self.evict(next(iter(self.entries)))
+
+    def put_disk(self, key: CacheKey, payload: bytes, token: int):
+        path = get_entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        # an invalidation journaled before the file appeared would have missed it
+        with self.lock:
+            self.sync()
+            if self.is_stale(key, token):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def tee(self, key: CacheKey, token: int, chunks: typing.Iterable[bytes]) -> typing.Iterator[bytes]:
+        # pass a streamed response through and keep it if it completes and stays small
+        kept = []
+        size = 0
+        for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                if size > QUERY_CACHE_MAX_ENTRY_BYTES:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+        if kept is not None:
+            self.put(key=key, payload=b''.join(kept), token=token)
+
+
+_query_cache: typing.Optional[QueryCache] = None
+
+
+def get_query_cache() -> typing.Optional[QueryCache]:
+    global _query_cache
+    if QUERY_CACHE_ENABLED and _query_cache is None:
+        _query_cache = QueryCache()
+    return _query_cache
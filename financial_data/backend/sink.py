@@ -0,0 +1,33 @@
+import pandas as pd
+from financial_data.backend import db, panel
+from financial_data.config import CRAWLER_SINKS
+
+
+def upload_mysql(df: pd.DataFrame, table: str, data_source: str) -> pd.DataFrame:
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        return db.upload_data(df, table, mysql_conn)
+
+
+def upload_parquet(df: pd.DataFrame, table: str, data_source: str):
+    # pyarrow is only imported by workers that write the lake
+    from financial_data.backend.lake import upload_parquet
+    upload_parquet(df=df, table=table, data_source=data_source)
+
+
+SINKS = dict(
+    mysql=upload_mysql,
+    parquet=upload_parquet,
+    panel=panel.upload_panel,
+)
+
+
+def upload(df: pd.DataFrame, table: str, data_source: str, sinks: list[str] = CRAWLER_SINKS) -> pd.DataFrame:
+    # the rows every sink took, the mysql sink leaves out the rows it rejected
+    if len(df) == 0:
+        return df
+    accepted = df
+    for sink in sinks:
+        written = SINKS[sink](df=df, table=table, data_source=data_source)
+        if written is not None:
+            accepted = written
+    return accepted
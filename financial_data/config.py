@@ -1,13 +1,113 @@
 import os
+import tempfile
 
 MYSQL_DATA_HOST = os.environ.get('MYSQL_DATA_HOST', '127.0.0.1')
 MYSQL_DATA_USER = os.environ.get('MYSQL_DATA_USER', 'root')
 MYSQL_DATA_PASSWORD = os.environ.get('MYSQL_DATA_PASSWORD', 'test')
 MYSQL_DATA_PORT = os.environ.get('MYSQL_DATA_PORT', '3306')
 MYSQL_DATA_DATABASE = os.environ.get('MYSQL_DATA_DATABASE', 'FinancialData')
+MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', '5'))
+MYSQL_MAX_OVERFLOW = int(os.environ.get('MYSQL_MAX_OVERFLOW', '10'))
+MYSQL_POOL_RECYCLE = int(os.environ.get('MYSQL_POOL_RECYCLE', '3600'))
+MYSQL_POOL_PRE_PING = os.environ.get('MYSQL_POOL_PRE_PING', 'true').lower() == 'true'
+MYSQL_UPSERT_BATCH_SIZE = int(os.environ.get('MYSQL_UPSERT_BATCH_SIZE', '5000'))
+# frames of at least this many rows go through LOAD DATA LOCAL INFILE, the server needs local_infile=ON;
+# keep it at or below CRAWLER_BATCH_UPLOAD_ROWS and WRITE_BEHIND_ROWS or no flushed batch ever reaches it
+MYSQL_BULK_LOAD_ROWS = int(os.environ.get('MYSQL_BULK_LOAD_ROWS', '50000'))
+# false skips LOAD DATA altogether, the shared pool never allows LOCAL INFILE either way
+MYSQL_LOCAL_INFILE = os.environ.get('MYSQL_LOCAL_INFILE', 'true').lower() == 'true'
+# yearly partitions of the fact tables are kept this many years past the current one
+PARTITION_YEARS_AHEAD = int(os.environ.get('PARTITION_YEARS_AHEAD', '1'))
 
 WORKER_ACCOUNT = os.environ.get('WORKER_ACCOUNT', 'worker')
 WORKER_PASSWORD = os.environ.get('WORKER_PASSWORD', 'worker')
 
 MESSAGE_QUEUE_HOST = os.environ.get('MESSAGE_QUEUE_HOST', '127.0.0.1')
 MESSAGE_QUEUE_PORT = os.environ.get('MESSAGE_QUEUE_PORT', '5672')
+# chords need a result backend that supports them, the data database is reused by default
+CELERY_RESULT_BACKEND = os.environ.get(
+    'CELERY_RESULT_BACKEND',
+    f'db+mysql+pymysql://{MYSQL_DATA_USER}:{MYSQL_DATA_PASSWORD}@{MYSQL_DATA_HOST}:{MYSQL_DATA_PORT}/{MYSQL_DATA_DATABASE}',
+)
+# dates packed into one task message, and rows buffered before an upload inside it
+CRAWLER_CHUNK_SIZE = int(os.environ.get('CRAWLER_CHUNK_SIZE', '20'))
+CRAWLER_BATCH_UPLOAD_ROWS = int(os.environ.get('CRAWLER_BATCH_UPLOAD_ROWS', '50000'))
+# where the crawler task writes validated frames, comma separated: mysql, parquet, panel
+CRAWLER_SINKS = [sink.strip() for sink in os.environ.get('CRAWLER_SINKS', 'mysql').split(',') if sink.strip()]
+DATA_LAKE_DIR = os.environ.get('DATA_LAKE_DIR', os.path.join(os.path.expanduser('~'), 'financial_data', 'lake'))
+# date x id memory-mapped arrays, one file per field; rows are business days counted from the epoch
+PANEL_DIR = os.environ.get('PANEL_DIR', os.path.join(os.path.expanduser('~'), 'financial_data', 'panel'))
+PANEL_EPOCH = os.environ.get('PANEL_EPOCH', '2000-01-01')
+PANEL_DAY_CHUNK = int(os.environ.get('PANEL_DAY_CHUNK', '260'))
+PANEL_STOCK_CAPACITY = int(os.environ.get('PANEL_STOCK_CAPACITY', '4096'))
+
+CRAWLER_TIMEOUT = float(os.environ.get('CRAWLER_TIMEOUT', '60'))
+CRAWLER_CONNECTIONS_PER_HOST = int(os.environ.get('CRAWLER_CONNECTIONS_PER_HOST', '2'))
+# requests per second per host, shared by all worker processes on the node
+CRAWLER_RATE_LIMIT = float(os.environ.get('CRAWLER_RATE_LIMIT', '0.2'))
+CRAWLER_RATE_LIMIT_BURST = float(os.environ.get('CRAWLER_RATE_LIMIT_BURST', '1'))
+# e.g. CRAWLER_RATE_LIMIT_HOSTS="www.twse.com.tw=0.5,www.tpex.org.tw=1"
+CRAWLER_RATE_LIMIT_HOSTS = {
+    host: float(rate)
+    for host, rate in (
+        item.split('=')
+        for item in os.environ.get('CRAWLER_RATE_LIMIT_HOSTS', '').split(',')
+        if item
+    )
+}
+CRAWLER_RATE_LIMIT_DIR = os.environ.get(
+    'CRAWLER_RATE_LIMIT_DIR', os.path.join(tempfile.gettempdir(), 'financial_data', 'rate_limit')
+)
+CRAWLER_CACHE_ENABLED = os.environ.get('CRAWLER_CACHE_ENABLED', 'true').lower() == 'true'
+CRAWLER_CACHE_DIR = os.environ.get(
+    'CRAWLER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'financial_data', 'raw')
+)
+CRAWLER_REPLAY = os.environ.get('CRAWLER_REPLAY', 'false').lower() == 'true'
+
+TRADING_CALENDAR_DIR = os.environ.get(
+    'TRADING_CALENDAR_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'financial_data', 'calendar')
+)
+
+API_HOST = os.environ.get('API_HOST', '0.0.0.0')
+API_PORT = int(os.environ.get('API_PORT', '8888'))
+API_WORKERS = int(os.environ.get('API_WORKERS', str(os.cpu_count() * 2 + 1)))
+# rows fetched from the server-side cursor per streamed chunk
+API_STREAM_ROWS = int(os.environ.get('API_STREAM_ROWS', '10000'))
+
+# the journal directory must be shared by crawler workers and the API so ingests reach every cache
+QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+QUERY_CACHE_DIR = os.environ.get(
+    'QUERY_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'financial_data', 'query_cache')
+)
+QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', '600'))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+QUERY_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('QUERY_CACHE_MAX_ENTRY_BYTES', str(16 * 1024 * 1024)))
+QUERY_CACHE_DISK = os.environ.get('QUERY_CACHE_DISK', 'false').lower() == 'true'
+# the invalidation journal is swapped for an empty one past this size, readers then drop their cache once
+QUERY_CACHE_JOURNAL_MAX_BYTES = int(os.environ.get('QUERY_CACHE_JOURNAL_MAX_BYTES', str(1024 * 1024)))
+
+# every worker instance on a host needs its own port, the multiprocess directory follows it
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9540'))
+METRICS_MULTIPROC_DIR = os.environ.get(
+    'METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'financial_data', 'metrics', str(METRICS_PORT))
+)
+
+# profile every task of these datasets, plus a random fraction of all other tasks
+PROFILE_DATASETS = [dataset for dataset in os.environ.get('PROFILE_DATASETS', '').split(',') if dataset]
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TRACEMALLOC = os.environ.get('PROFILE_TRACEMALLOC', 'true').lower() == 'true'
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'financial_data', 'profile')
+)
+
+# rows MySQL refuses are appended here as JSON lines instead of failing the whole upload
+REJECT_DIR = os.environ.get(
+    'REJECT_DIR', os.path.join(os.path.expanduser('~'), 'financial_data', 'rejects')
+)
+
+# coalesce uploads of many crawler tasks in one worker, meant for the threads pool (-P threads -c N)
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_ROWS = int(os.environ.get('WRITE_BEHIND_ROWS', '50000'))
+WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', '2'))
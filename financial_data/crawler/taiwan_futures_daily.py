@@ -0,0 +1,198 @@
+from typing import Union
+import datetime
+import io
+from financial_data import metrics
+from financial_data.backend.http.fetch import Response, fetch, fetch_async, run, split_failed
+from financial_data.schema.dataset import apply_dtype_plan, check_schema
+from financial_data.trading_calendar import is_closed, mark_closed
+from loguru import logger
+import pandas as pd
+
+TABLE = 'TaiwanFuturesDaily'
+DATA_SOURCE = 'taifex'
+DATA_SOURCES = [DATA_SOURCE]
+
+def is_weekend(day: int) -> bool:
+    return day in [5, 6]
+
+def gen_date_list(start_date: str, end_date: str) -> list[datetime.date]:
+    start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+    end_date = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    days = (end_date - start_date).days + 1
+    return [
+        d
+        for d in (start_date + datetime.timedelta(days=day) for day in range(days))
+        if not is_weekend(d.weekday())
+        and not is_closed(exchange=DATA_SOURCE, date=str(d))
+    ]
+
+def gen_task_parameter_list(start_date: str, end_date: str) -> list[dict[str, str]]:
+    # getFutcontractDl accepts a range of up to one month, one request per calendar month
+    months = {}
+    for d in gen_date_list(start_date=start_date, end_date=end_date):
+        months.setdefault((d.year, d.month), []).append(d)
+    return [
+        dict(date=str(dates[0]), end_date=str(dates[-1]), data_source=DATA_SOURCE)
+        for dates in months.values()
+    ]
+
+NUMERIC_COLUMNS = [
+    'Open',
+    'Max',
+    'Min',
+    'Close',
+    'Change',
+    'ChangePer',
+    'Volume',
+    'SettlementPrice',
+    'OpenInterest',
+]
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    df['date'] = df['date'].astype(str).str.strip().str.replace('/', '-')
+    df['FuturesID'] = df['FuturesID'].astype(str).str.strip()
+    df['ContractDate'] = df['ContractDate'].astype(str).str.replace(' ', '')
+    if 'TradingSession' in df.columns:
+        df['TradingSession'] = df['TradingSession'].astype(str).str.strip().map(
+            {
+                '一般': 'Position',
+                '盤後': 'AfterMarket'
+            }
+        )
+    else:
+        df['TradingSession'] = 'Position'
+
+    for col in NUMERIC_COLUMNS:
+        text = df[col].astype(str).str.strip().str.replace('%', '', regex=False)
+        # a lone '-' means no trade, replacing every '-' used to turn -12 into 012
+        text = text.mask(text == '-', '0')
+        df[col] = pd.to_numeric(text, errors='coerce')
+    df = df.fillna(0)
+    return df
+
+def transfer_colname_zh2en(df: pd.DataFrame) -> pd.DataFrame:
+    colname_dict = {
+        '交易日期': 'date',
+        '契約': 'FuturesID',
+        '到期月份(週別)': 'ContractDate',
+        '開盤價': 'Open',
+        '最高價': 'Max',
+        '最低價': 'Min',
+        '收盤價': 'Close',
+        '漲跌價': 'Change',
+        '漲跌%': 'ChangePer',
+        '成交量': 'Volume',
+        '結算價': 'SettlementPrice',
+        '未沖銷契約數': 'OpenInterest',
+        '交易時段': 'TradingSession',
+    }
+    df = df[[col for col in df.columns if col in colname_dict]]
+    df.columns = [
+        colname_dict[col]
+        for col in df.columns
+    ]
+    return df
+
+def get_futures_headers():
+    return {
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "Accept-Encoding": "gzip, deflate",
+        "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7,zh-CN;q=0.6",
+        "Connection": "keep-alive",
+        "Host": "www.taifex.com.tw",
+        "Referer": "https://www.taifex.com.tw/cht/3/futDailyMarketView",
+        "Sec-Fetch-Dest": "empty",
+        "Sec-Fetch-Mode": "cors",
+        "Sec-Fetch-Site": "same-origin",
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36",
+        "X-Requested-With": "XMLHttpRequest",
+    }
+
+def get_futures_url(date: str, end_date: str = None) -> str:
+    start = date.replace('-', '')
+    end = (end_date or date).replace('-', '')
+    return f'https://www.taifex.com.tw/cht/3/getFutcontractDl?queryStartDate={start}&queryEndDate={end}'
+
+def has_futures_header(res: Response) -> bool:
+    # only a payload that opens with the csv header is cached, not an error page
+    header = res.content.split(b'\n', 1)[0]
+    try:
+        return '交易日期' in header.decode('big5')
+    except UnicodeDecodeError:
+        return False
+
+def parse_futures(res: Response) -> pd.DataFrame:
+    if res.ok and res.content:
+        return pd.read_csv(io.StringIO(res.content.decode('big5')), index_col=False)
+    return pd.DataFrame()
+
+def crawler_futures(date: str, end_date: str = None) -> pd.DataFrame:
+    # the response is cached under the last day of the window, so only settled windows are kept
+    res = fetch(
+        url=get_futures_url(date=date, end_date=end_date),
+        headers=get_futures_headers(),
+        date=end_date or date,
+        validate=has_futures_header,
+    )
+    with metrics.stage('parse'):
+        return parse_futures(res=res)
+
+async def crawler_futures_async(date: str, end_date: str = None) -> pd.DataFrame:
+    res = await fetch_async(
+        url=get_futures_url(date=date, end_date=end_date),
+        headers=get_futures_headers(),
+        date=end_date or date,
+        validate=has_futures_header,
+    )
+    with metrics.stage('parse'):
+        return parse_futures(res=res)
+
+def split_by_date(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    return {
+        pd.Timestamp(date).strftime('%Y-%m-%d'): day_df.reset_index(drop=True)
+        for date, day_df in df.groupby('date', sort=True)
+    }
+
+def clean(df: pd.DataFrame, date: str, end_date: str) -> pd.DataFrame:
+    if len(df) == 0:
+        return pd.DataFrame()
+    df = clean_data(transfer_colname_zh2en(df.copy()))
+    df = apply_dtype_plan(df=df, dataset=TABLE, columns=['FuturesID', 'ContractDate', 'TradingSession', 'date'])
+    frames = split_by_date(df)
+    # weekdays of the window without a single row are exchange holidays
+    for d in gen_date_list(start_date=date, end_date=end_date):
+        if str(d) not in frames:
+            mark_closed(exchange=DATA_SOURCE, date=str(d))
+    return pd.concat(frames.values(), ignore_index=True) if frames else pd.DataFrame()
+
+def crawler(parameter: dict[str, list[Union[str, int, float]]]) -> pd.DataFrame:
+    logger.info(f'{parameter=}')
+    date = parameter.get('date', '')
+    end_date = parameter.get('end_date', date)
+    with metrics.labels(dataset=TABLE, data_source=DATA_SOURCE):
+        df = crawler_futures(date=date, end_date=end_date)
+        with metrics.stage('clean'):
+            df = clean(df=df, date=date, end_date=end_date)
+        with metrics.stage('validate'):
+            df = check_schema(df=df, dataset=TABLE)
+        metrics.count_rows(stage='validate', rows=len(df))
+    return df
+
+async def crawler_async(parameter: dict[str, list[Union[str, int, float]]]) -> pd.DataFrame:
+    logger.info(f'{parameter=}')
+    date = parameter.get('date', '')
+    end_date = parameter.get('end_date', date)
+    with metrics.labels(dataset=TABLE, data_source=DATA_SOURCE):
+        df = await crawler_futures_async(date=date, end_date=end_date)
+        with metrics.stage('clean'):
+            df = clean(df=df, date=date, end_date=end_date)
+        with metrics.stage('validate'):
+            df = check_schema(df=df, dataset=TABLE)
+        metrics.count_rows(stage='validate', rows=len(df))
+    return df
+
+def crawler_many(
+    parameter_list: list[dict[str, str]]
+) -> tuple[list[tuple[dict[str, str], pd.DataFrame]], list[dict[str, str]]]:
+    results = run([crawler_async(parameter=parameter) for parameter in parameter_list])
+    return split_failed(parameter_list=parameter_list, results=results)
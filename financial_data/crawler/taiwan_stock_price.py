@@ -1,32 +1,69 @@
+import collections
+import typing
 from typing import Union
 import datetime
-from financial_data.schema.dataset import check_schema
+import re
+from financial_data import metrics
+from financial_data.backend.http.fetch import Response, fetch, fetch_async, is_json, run, split_failed
+from financial_data.schema.dataset import apply_dtype_plan, check_schema
+from financial_data.trading_calendar import is_closed, mark_closed
 from loguru import logger
 import pandas as pd
-import time
-import requests
+
+TABLE = 'TaiwanStockPrice'
+DATA_SOURCES = ['twse', 'tpex']
 
 def is_weekend(day: int) -> bool:
-    return day in [0, 6]
+    return day in [5, 6]
 
 def gen_date_list(start_date: str, end_date: str) -> list[str]:
     start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
     end_date = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()    
     days = (end_date - start_date).days + 1
     date_list = [
-        str(start_date + datetime.timedelta(days=day))
+        start_date + datetime.timedelta(days=day)
         for day in range(days)
     ]
     date_list = [
         dict(date=str(d), data_source=data_source)
         for d in date_list
-        for data_source in [
-            'twse', 'tpex'
-        ]
+        for data_source in DATA_SOURCES
         if not is_weekend(d.weekday())
+        and not is_closed(exchange=data_source, date=str(d))
     ]
     return date_list
 
+def gen_task_parameter_list(start_date: str, end_date: str) -> list[dict[str, str]]:
+    return gen_date_list(start_date=start_date, end_date=end_date)
+
+# thousands separators are stripped from every value, the remaining markers (X, +, ----, 除權息, ...)
+# only show up on a few rows and are cleaned on those rows alone, same result as the former
+# chain of eleven str.replace calls
+CLEAN_DELETE = str.maketrans('', '', ',X+')
+CLEAN_ZERO = re.compile('----|---|--|除權息|除息|除權')
+CHANGE_DELETE = str.maketrans('', '', ' X')
+DIR_TEXT = re.compile('^[^>]*>([^<]*)')
+
+def to_numeric(text: pd.Series, strip: str, delete: dict[int, None], zero: re.Pattern = None) -> pd.Series:
+    text = text.str.replace(strip, '', regex=False)
+    values = pd.to_numeric(text, errors='coerce')
+    failed = values.isna().to_numpy()
+    if failed.any():
+        failed[failed] = text[failed].str.lower().to_numpy() != 'nan'
+    if not failed.any():
+        return values
+    fixed = text[failed].str.translate(delete)
+    if zero is not None:
+        fixed = fixed.str.replace(zero, '0', regex=True)
+    values = values.astype('float64')
+    values[failed] = pd.to_numeric(fixed, errors='coerce')
+    text[failed] = fixed
+    failed[failed] = values[failed].isna().to_numpy() & (fixed.str.lower().to_numpy() != 'nan')
+    if failed.any():
+        # keep the text so check_schema can report the offending rows
+        return text.where(failed, values)
+    return values
+
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     for col in [
         'TradeVolume',
@@ -38,47 +75,51 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
         'Close',
         'Change',
     ]:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(',', '')
-            .str.replace('X', '')
-            .str.replace('+', '')
-            .str.replace('----', '0')
-            .str.replace('---', '0')
-            .str.replace('--', '0')
-            .str.replace('除權息', '0')
-            .str.replace('除息', '0')
-            .str.replace('除權', '0')
-        )
+        df[col] = to_numeric(df[col].astype(str), strip=',', delete=CLEAN_DELETE, zero=CLEAN_ZERO)
     return df
 
+TWSE_COLNAME = {
+    '證券代號': 'StockID',
+    '證券名稱': '',
+    '成交股數': 'TradeVolume',
+    '成交筆數': 'Transaction',
+    '成交金額': 'TradeValue',
+    '開盤價': 'Open',
+    '最高價': 'Max',
+    '最低價': 'Min',
+    '收盤價': 'Close',
+    '漲跌(+/-)': 'Dir',
+    '漲跌價差': 'Change',
+    '最後揭示買價': '',
+    '最後揭示買量': '',
+    '最後揭示賣價': '',
+    '最後揭示賣量': '',
+    '本益比': '',
+}
+# the daily quote table is the one carrying these fields, wherever MI_INDEX puts it
+TWSE_SIGNATURE = ('證券代號', '收盤價')
+
 def transfer_colname_zh2en(df: pd.DataFrame, colname: list[str]) -> pd.DataFrame:
-    taiwan_stock_price = {
-        '證券代號': 'StockID', 
-        '證券名稱': '',
-        '成交股數': 'TradeVolume',
-        '成交筆數': 'Transaction',
-        '成交金額': 'TradeValue',
-        '開盤價': 'Open',
-        '最高價': 'Max',
-        '最低價': 'Min',
-        '收盤價': 'Close',
-        '漲跌(+/-)': 'Dir',
-        '漲跌價差': 'Change',
-        '最後揭示買價': '',
-        '最後揭示買量': '',
-        '最後揭示賣價': '',
-        '最後揭示賣量': '',
-        '本益比': '',
-    }
     df.columns = [
-        taiwan_stock_price[col]
+        TWSE_COLNAME[col]
         for col in colname
     ]
     df = df.drop([''], axis=1)
     return df
 
+def frame_from_rows(rows: list[list], columns: dict[str, int], width: int = None) -> pd.DataFrame:
+    # zip would cut every column to the shortest row, rows not as wide as the header are dropped instead;
+    # without a header the most common row width is taken as the expected one
+    if width is None:
+        width = collections.Counter(len(row) for row in rows).most_common(1)[0][0]
+    ragged = [row for row in rows if len(row) != width]
+    if ragged:
+        logger.info(f'{len(ragged)} of {len(rows)} rows are not {width} columns wide, skipped: {ragged[:3]}')
+        rows = [row for row in rows if len(row) == width]
+    # transpose once and keep only the wanted positions, no intermediate frame of every column
+    values = list(zip(*rows)) or [()] * width
+    return pd.DataFrame({name: values[i] for name, i in columns.items()})
+
 def get_twse_headers():
     return {
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -129,85 +170,149 @@ def convert_date(date: str) -> str:
     year = int(year) - 1911
     return f'{year}/{month}/{day}'
 
-def crawler_tpex(date: str) -> pd.DataFrame:
+def get_tpex_url(date: str) -> str:
     _date = convert_date(date=date)
-    url = f'https://www.tpex.org.tw/web/stock/aftertrading/otc_quotes_no1430/stk_wn1430_result.php?l=zh-tw&d={_date}&se=AL'
-    time.sleep(5)
-    res = requests.get(
-        url=url,
-        headers=get_tpex_headers()
-    )
+    return f'https://www.tpex.org.tw/web/stock/aftertrading/otc_quotes_no1430/stk_wn1430_result.php?l=zh-tw&d={_date}&se=AL'
+
+TPEX_COLUMNS = dict(
+    StockID=0,
+    Close=2,
+    Change=3,
+    Open=4,
+    Max=5,
+    Min=6,
+    TradeVolume=7,
+    TradeValue=8,
+    Transaction=9,
+)
+
+def parse_tpex(res: Response, date: str) -> pd.DataFrame:
+    if not res.ok or not res.content:
+        return pd.DataFrame()
     data = res.json().get('aaData', '')
     if not data:
+        mark_closed(exchange='tpex', date=date)
         return pd.DataFrame()
-    df = pd.DataFrame(data)
-
-    if len(df) == 0:
-        return pd.DataFrame()
-    
-    df = df[[0, 2, 3, 4, 5, 6, 7, 8, 9]]
-    df = set_column(df.copy())
+    df = frame_from_rows(data, TPEX_COLUMNS)
     df['date'] = date
-    return df
+    return apply_dtype_plan(df=df, dataset=TABLE, columns=['StockID', 'date'])
 
-def crawler_twse(date: str) -> pd.DataFrame:
+def crawler_tpex(date: str) -> pd.DataFrame:
+    res = fetch(url=get_tpex_url(date=date), headers=get_tpex_headers(), date=date, validate=is_json)
+    with metrics.stage('parse'):
+        return parse_tpex(res=res, date=date)
+
+async def crawler_tpex_async(date: str) -> pd.DataFrame:
+    res = await fetch_async(url=get_tpex_url(date=date), headers=get_tpex_headers(), date=date, validate=is_json)
+    with metrics.stage('parse'):
+        return parse_tpex(res=res, date=date)
+
+def get_twse_url(date: str) -> str:
     _date = date.replace('-', '')
-    url = f'https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?date={_date}&type=ALL&response=json'
-    time.sleep(5)
-    res = requests.get(
-        url=url, 
-        headers=get_twse_headers()
-    )
-    
+    return f'https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?date={_date}&type=ALL&response=json'
+
+def iter_twse_tables(payload: dict) -> typing.Iterator[dict]:
+    # current payloads list `tables`, older ones number them as fields1/data1, fields2/data2, ...
+    yield from payload.get('tables', [])
+    for key, fields in payload.items():
+        if key.startswith('fields') and key[len('fields'):].isdigit():
+            yield dict(fields=fields, data=payload.get(f'data{key[len("fields"):]}', []))
+
+def find_twse_table(payload: dict) -> typing.Optional[dict]:
+    for table in iter_twse_tables(payload):
+        fields = table.get('fields') or []
+        if all(field in fields for field in TWSE_SIGNATURE):
+            return table
+    return None
+
+def parse_twse(res: Response, date: str) -> pd.DataFrame:
     try:
-        if res.json()['stat'] in ['查詢日期小於93年2月11日，請重新查詢!', '很抱歉，沒有符合條件的資料!']:
-            return pd.DataFrame
-        else:
-            df = pd.DataFrame(
-                res.json()['tables'][8]['data']
-            )
-            colname = res.json()['tables'][8]['fields']
-    except BaseException:
-        return pd.DataFrame
-    
-    if len(df) == 0:
-        return pd.DataFrame
-    
-    df = transfer_colname_zh2en(df.copy(), colname)
+        payload = res.json()
+    except ValueError:
+        return pd.DataFrame()
+    if payload.get('stat') in ['查詢日期小於93年2月11日，請重新查詢!', '很抱歉，沒有符合條件的資料!']:
+        if payload['stat'] == '很抱歉，沒有符合條件的資料!':
+            mark_closed(exchange='twse', date=date)
+        return pd.DataFrame()
+    table = find_twse_table(payload)
+    if table is None or not table.get('data'):
+        return pd.DataFrame()
+    columns = {
+        TWSE_COLNAME[field]: i
+        for i, field in enumerate(table['fields'])
+        if TWSE_COLNAME.get(field)
+    }
+    df = frame_from_rows(table['data'], columns, width=len(table['fields']))
     df['date'] = date
-    return df
+    return apply_dtype_plan(df=df, dataset=TABLE, columns=['StockID', 'date'])
+
+def crawler_twse(date: str) -> pd.DataFrame:
+    res = fetch(url=get_twse_url(date=date), headers=get_twse_headers(), date=date, validate=is_json)
+    with metrics.stage('parse'):
+        return parse_twse(res=res, date=date)
+
+async def crawler_twse_async(date: str) -> pd.DataFrame:
+    res = await fetch_async(url=get_twse_url(date=date), headers=get_twse_headers(), date=date, validate=is_json)
+    with metrics.stage('parse'):
+        return parse_twse(res=res, date=date)
 
 def convert_change(df: pd.DataFrame) -> pd.DataFrame:
-    df['Dir'] = ( 
-        df['Dir']
-        .str.split('>')
-        .str[1]
-        .str.split('<')
-        .str[0]
-    )
-    df['Change'] = (
-        df['Dir'] + df['Change']
-    )
-    df['Change'] = (
-        df['Change']
-        .str.replace(' ', '')
-        .str.replace('X', '')
-        .astype(float)
+    # Dir is an html fragment such as <p style= color:red>+</p>, its text is the sign of Change
+    df['Change'] = to_numeric(
+        df['Dir'].str.extract(DIR_TEXT, expand=False) + df['Change'],
+        strip=' ',
+        delete=CHANGE_DELETE,
     )
-    df = df.fillna('')
+    df = df.fillna({col: '' for col in df.columns if df[col].dtype == object})
     df = df.drop(['Dir'], axis=1)
     return df
 
 
+def clean(df: pd.DataFrame, data_source: str) -> pd.DataFrame:
+    if len(df) == 0:
+        return df
+    if data_source == 'twse':
+        df = convert_change(df)
+    return clean_data(df)
+
+
 def crawler(parameter: dict[str, list[Union[str, int, float]]]) -> pd.DataFrame:
     logger.info(f'{parameter=}')
     date = parameter.get('date', '')
     data_source = parameter.get('data_source', '')
-    if data_source == 'twse':
-        df = crawler_twse(date=date)
-    elif data_source == 'tpex':
-        df = crawler_tpex(date=date)
-    df = check_schema(df=df, dataset='TaiwanStockPrice')
+    with metrics.labels(dataset=TABLE, data_source=data_source):
+        if data_source == 'twse':
+            df = crawler_twse(date=date)
+        elif data_source == 'tpex':
+            df = crawler_tpex(date=date)
+        with metrics.stage('clean'):
+            df = clean(df=df, data_source=data_source)
+        with metrics.stage('validate'):
+            df = check_schema(df=df, dataset=TABLE)
+        metrics.count_rows(stage='validate', rows=len(df))
+    return df
+
+
+async def crawler_async(parameter: dict[str, list[Union[str, int, float]]]) -> pd.DataFrame:
+    logger.info(f'{parameter=}')
+    date = parameter.get('date', '')
+    data_source = parameter.get('data_source', '')
+    with metrics.labels(dataset=TABLE, data_source=data_source):
+        if data_source == 'twse':
+            df = await crawler_twse_async(date=date)
+        elif data_source == 'tpex':
+            df = await crawler_tpex_async(date=date)
+        with metrics.stage('clean'):
+            df = clean(df=df, data_source=data_source)
+        with metrics.stage('validate'):
+            df = check_schema(df=df, dataset=TABLE)
+        metrics.count_rows(stage='validate', rows=len(df))
     return df
 
 
+def crawler_many(
+    parameter_list: list[dict[str, str]]
+) -> tuple[list[tuple[dict[str, str], pd.DataFrame]], list[dict[str, str]]]:
+    # twse and tpex requests are in flight at the same time
+    results = run([crawler_async(parameter=parameter) for parameter in parameter_list])
+    return split_failed(parameter_list=parameter_list, results=results)
@@ -0,0 +1,85 @@
+import contextlib
+import contextvars
+import glob
+import os
+import time
+import typing
+from financial_data.config import METRICS_HOST, METRICS_MULTIPROC_DIR, METRICS_PORT
+from loguru import logger
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, start_http_server, values
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    'financial_data_stage_seconds',
+    'Time spent in a crawl stage',
+    ['dataset', 'data_source', 'stage'],
+    buckets=BUCKETS,
+)
+ROWS = Counter(
+    'financial_data_rows',
+    'Rows leaving a crawl stage',
+    ['dataset', 'data_source', 'stage'],
+)
+DOWNLOAD_BYTES = Counter(
+    'financial_data_download_bytes',
+    'Response bytes received from exchanges, cache hits excluded',
+    ['dataset', 'data_source'],
+)
+
+# set by the dataset crawler and the task, read by every stage below them
+_labels: contextvars.ContextVar[tuple[str, str]] = contextvars.ContextVar('metrics_labels', default=('', ''))
+
+
+@contextlib.contextmanager
+def labels(dataset: str, data_source: str) -> typing.Iterator[None]:
+    token = _labels.set((dataset, data_source))
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def observe(stage: str, seconds: float):
+    STAGE_SECONDS.labels(*_labels.get(), stage).observe(seconds)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> typing.Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage=name, seconds=time.perf_counter() - start)
+
+
+def count_rows(stage: str, rows: int):
+    ROWS.labels(*_labels.get(), stage).inc(rows)
+
+
+def count_bytes(size: int):
+    DOWNLOAD_BYTES.labels(*_labels.get()).inc(size)
+
+
+def enable_multiprocess():
+    # prefork children write their samples to files here, the worker's main process serves the sum;
+    # prometheus_client picks the value class on import, so pick again before the first labeled sample
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', METRICS_MULTIPROC_DIR)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    values.ValueClass = values.get_value_class()
+
+
+def start_server():
+    # called once in the worker's main process before the pool forks, files of a previous run are stale
+    enable_multiprocess()
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(METRICS_PORT, addr=METRICS_HOST, registry=registry)
+    logger.info(f'metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics')
+
+
+def mark_process_dead(pid: int):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,81 @@
+import datetime
+import sys
+from collections import defaultdict
+from financial_data import registry
+from financial_data.backend import db
+from financial_data.trading_calendar import is_closed
+from loguru import logger
+
+def get_parameter_dates(parameter: dict[str, str]) -> list[str]:
+    # a parameter covers `date`, or every open weekday from `date` to `end_date` for range requests
+    if 'end_date' not in parameter:
+        return [parameter.get('date', '')]
+    data_source = parameter.get('data_source', '')
+    start_date = datetime.date.fromisoformat(parameter['date'])
+    end_date = datetime.date.fromisoformat(parameter['end_date'])
+    dates = (start_date + datetime.timedelta(days=day) for day in range((end_date - start_date).days + 1))
+    return [
+        str(d)
+        for d in dates
+        if d.weekday() < 5 and not is_closed(exchange=data_source, date=str(d))
+    ]
+
+def narrow(parameter: dict[str, str], covered: set[tuple[str, str]]) -> dict[str, str]:
+    # shrink a range request to the span of its uncovered dates, None when every date is covered
+    data_source = parameter.get('data_source', '')
+    dates = [date for date in get_parameter_dates(parameter) if (data_source, date) not in covered]
+    if not dates:
+        return None
+    if 'end_date' not in parameter:
+        return parameter
+    return dict(parameter, date=dates[0], end_date=dates[-1])
+
+def plan(dataset: str, start_date: str, end_date: str) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    parameter_list = registry.get_dataset(dataset).gen_task_parameter_list(start_date=start_date, end_date=end_date)
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        covered = db.load_coverage(
+            dataset=dataset, start_date=start_date, end_date=end_date, mysql_conn=mysql_conn
+        )
+    parameter_list = [
+        parameter
+        for parameter in parameter_list
+        if not is_closed(exchange=parameter.get('data_source', ''), date=parameter.get('date', ''))
+    ]
+    missing = [
+        parameter
+        for parameter in (narrow(parameter=parameter, covered=covered) for parameter in parameter_list)
+        if parameter is not None
+    ]
+    return parameter_list, missing
+
+def summarize(dataset: str, parameter_list: list[dict[str, str]], missing: list[dict[str, str]]):
+    total = defaultdict(int)
+    gaps = defaultdict(list)
+    for parameter in parameter_list:
+        total[parameter.get('data_source', '')] += 1
+    for parameter in missing:
+        gaps[parameter.get('data_source', '')].append(parameter.get('date', ''))
+    for data_source, count in total.items():
+        dates = gaps[data_source]
+        span = f', {dates[0]} ~ {dates[-1]}' if dates else ''
+        logger.info(
+            f'{dataset} {data_source}: {count} planned, {count - len(dates)} covered, {len(dates)} to enqueue{span}'
+        )
+
+def backfill(dataset: str):
+    # one-off for rows uploaded before coverage was recorded, otherwise the first plan re-crawls all history
+    spec = registry.get_dataset(dataset)
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        for data_source in spec.data_sources:
+            rows = db.backfill_coverage(
+                dataset=dataset, table=spec.table, data_source=data_source, mysql_conn=mysql_conn
+            )
+            logger.info(f'{dataset} {data_source}: {rows} dates backfilled into coverage')
+
+if __name__ == '__main__':
+    # python -m financial_data.planner backfill [dataset ...]
+    command, datasets = sys.argv[1], sys.argv[2:]
+    if command != 'backfill':
+        raise ValueError(f'unknown command {command}, expected backfill')
+    for dataset in datasets or list(registry.DATASET_MODULES):
+        backfill(dataset=dataset)
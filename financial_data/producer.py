@@ -1,21 +1,39 @@
 import sys
-import importlib
+from collections import defaultdict
+from celery import chord
+from financial_data import registry
 from financial_data.backend import db
-from financial_data.tasks.task import crawler
+from financial_data.backend.db import migration
+from financial_data.config import CRAWLER_CHUNK_SIZE
+from financial_data.planner import plan, summarize
+from financial_data.tasks.task import crawler_batch, crawler_report
 from loguru import logger
 
-def Update(dataset: str, start_date: str, end_date: str):
-    parameter_list = getattr(
-        importlib.import_module(f'financial_data.crawler.{dataset}'),
-        'gen_task_parameter_list',
-    )(start_date=start_date, end_date=end_date)
-    for parameter in parameter_list:
-        logger.info(f'{dataset}, {parameter}')
-        task = crawler.s(dataset, parameter)
-        task.apply_async(queue=parameter.get('data_source', ''))
+def Update(dataset: str, start_date: str, end_date: str, dry_run: bool = False, chunk_size: int = CRAWLER_CHUNK_SIZE):
+    parameter_list, missing = plan(dataset=dataset, start_date=start_date, end_date=end_date)
+    summarize(dataset=dataset, parameter_list=parameter_list, missing=missing)
+    if dry_run:
+        return
+    try:
+        # rows past the last yearly partition would pile up in pmax, split it before they arrive
+        with db.router.mysql_financial_data_connect() as mysql_conn:
+            migration.extend(table=registry.get_dataset(dataset).table, mysql_conn=mysql_conn, until=end_date)
+    except Exception as e:
+        logger.info(f'extend partitions error: {e}')
+    parameter_by_source = defaultdict(list)
+    for parameter in missing:
+        parameter_by_source[parameter.get('data_source', '')].append(parameter)
+    for data_source, parameters in parameter_by_source.items():
+        # one message per chunk of dates, the callback fires once every chunk of this source is done
+        header = [
+            crawler_batch.s(dataset, parameters[i:i + chunk_size]).set(queue=data_source)
+            for i in range(0, len(parameters), chunk_size)
+        ]
+        logger.info(f'{dataset}, {data_source}: {len(parameters)} parameters in {len(header)} tasks')
+        chord(header)(crawler_report.s(dataset, data_source).set(queue=data_source))
 
     db.router.close_connection()
 
 if __name__ == '__main__':
-    dataset, start_date, end_date = sys.argv[1:]
-    Update(dataset=dataset, start_date=start_date, end_date=end_date)
\ No newline at end of file
+    dataset, start_date, end_date = sys.argv[1:4]
+    Update(dataset=dataset, start_date=start_date, end_date=end_date, dry_run='--dry-run' in sys.argv[4:])
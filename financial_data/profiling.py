@@ -0,0 +1,98 @@
+import contextlib
+import cProfile
+import glob
+import os
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+import typing
+from collections import defaultdict
+from financial_data.config import PROFILE_DATASETS, PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_TRACEMALLOC
+from loguru import logger
+
+
+def should_profile(dataset: str) -> bool:
+    return dataset in PROFILE_DATASETS or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def get_profile_name(dataset: str, parameter: dict[str, str]) -> str:
+    # the timestamp and pid keep reruns of the same (dataset, date, data_source) apart
+    date = parameter.get('date', '')
+    if parameter.get('end_date'):
+        date = f'{date}~{parameter["end_date"]}'
+    return f'{dataset}_{date}_{parameter.get("data_source", "")}_{int(time.time())}_{os.getpid()}'
+
+
+@contextlib.contextmanager
+def profile(dataset: str, parameter: dict[str, str]) -> typing.Iterator[None]:
+    if not should_profile(dataset):
+        yield
+        return
+    trace = PROFILE_TRACEMALLOC and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, get_profile_name(dataset=dataset, parameter=parameter))
+        if trace:
+            # taken before dumping so the profiler's own allocations stay out of it
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, cProfile.__file__),
+                ]
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot.dump(f'{path}.tracemalloc')
+            logger.info(f'profile peak traced memory {peak / 1024 / 1024:.1f} MB')
+        profiler.dump_stats(f'{path}.prof')
+        logger.info(f'profile written to {path}.prof')
+
+
+def summarize(directory: str = PROFILE_DIR, dataset: str = '', top: int = 20):
+    paths = sorted(glob.glob(os.path.join(directory, f'{dataset}*.prof')))
+    if not paths:
+        logger.info(f'no profiles in {directory}')
+        return
+    runs = []
+    stats = None
+    for path in paths:
+        run = pstats.Stats(path)
+        runs.append((run.total_tt, os.path.basename(path)[: -len('.prof')]))
+        if stats is None:
+            stats = run
+        else:
+            stats.add(run)
+    runs.sort(reverse=True)
+    print(f'{len(runs)} runs, {sum(tt for tt, _ in runs):.1f}s total, slowest:')
+    for tt, name in runs[:10]:
+        print(f'{tt:10.2f}s  {name}')
+    print()
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+    allocations = defaultdict(lambda: [0, 0])
+    snapshots = sorted(glob.glob(os.path.join(directory, f'{dataset}*.tracemalloc')))
+    for path in snapshots:
+        for stat in tracemalloc.Snapshot.load(path).statistics('lineno'):
+            key = str(stat.traceback)
+            allocations[key][0] = max(allocations[key][0], stat.size)
+            allocations[key][1] += 1
+    if allocations:
+        print(f'memory still allocated at task end, largest per line across {len(snapshots)} runs:')
+        for key, (size, count) in sorted(allocations.items(), key=lambda item: -item[1][0])[:top]:
+            print(f'{size / 1024:12.1f} KiB  {count:4d} runs  {key}')
+
+
+if __name__ == '__main__':
+    # python -m financial_data.profiling [dataset] [top]
+    dataset = sys.argv[1] if len(sys.argv) > 1 else ''
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    summarize(dataset=dataset, top=top)
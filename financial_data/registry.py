@@ -0,0 +1,51 @@
+import dataclasses
+import importlib
+import typing
+from financial_data.schema.dataset import SCHEMAS
+
+from pydantic import BaseModel
+
+# dataset name, as used by the producer and the task messages, to its crawler module
+DATASET_MODULES = dict(
+    taiwan_stock_price='financial_data.crawler.taiwan_stock_price',
+    taiwan_futures_daily='financial_data.crawler.taiwan_futures_daily',
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Dataset:
+    name: str
+    table: str
+    data_sources: list[str]
+    crawler: typing.Callable
+    crawler_many: typing.Callable
+    gen_task_parameter_list: typing.Callable
+    schema: type[BaseModel]
+
+
+_datasets: dict[str, Dataset] = {}
+
+
+def get_dataset(name: str) -> Dataset:
+    dataset = _datasets.get(name)
+    if dataset is None:
+        if name not in DATASET_MODULES:
+            raise ValueError(f'unknown dataset {name}, expected one of {", ".join(DATASET_MODULES)}')
+        module = importlib.import_module(DATASET_MODULES[name])
+        dataset = Dataset(
+            name=name,
+            table=module.TABLE,
+            data_sources=module.DATA_SOURCES,
+            crawler=module.crawler,
+            crawler_many=module.crawler_many,
+            gen_task_parameter_list=module.gen_task_parameter_list,
+            schema=SCHEMAS[module.TABLE],
+        )
+        _datasets[name] = dataset
+    return dataset
+
+
+def preload():
+    # run in the worker's main process so every pool process starts with the crawlers imported
+    for name in DATASET_MODULES:
+        get_dataset(name)
@@ -0,0 +1,22 @@
+import sys
+from financial_data import registry
+from financial_data.backend import db
+from financial_data.backend.http.cache import set_replay
+from loguru import logger
+
+def Replay(dataset: str, start_date: str, end_date: str):
+    # rebuild a table from cached raw responses, no request leaves the process
+    set_replay(True)
+    spec = registry.get_dataset(dataset)
+    parameter_list = spec.gen_task_parameter_list(start_date=start_date, end_date=end_date)
+    rows = 0
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        for parameter in parameter_list:
+            df = spec.crawler(parameter=parameter)
+            db.upload_data(df, spec.table, mysql_conn)
+            rows += len(df)
+    logger.info(f'replay {dataset} {start_date} ~ {end_date}: {len(parameter_list)} parameters, {rows} rows')
+
+if __name__ == '__main__':
+    dataset, start_date, end_date = sys.argv[1:]
+    Replay(dataset=dataset, start_date=start_date, end_date=end_date)
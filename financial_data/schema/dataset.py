@@ -1,6 +1,6 @@
 
-import importlib
 from pydantic import BaseModel
+import numpy as np
 import pandas as pd
 
 class TaiwanStockPrice(BaseModel):
@@ -29,12 +29,166 @@ class TaiwanStockPrice(BaseModel):
     date: str
 
 
-def check_schema(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+class TaiwanFuturesDaily(BaseModel):
+    FuturesID: str
+    ContractDate: str
+    Open: float
+    Max: float
+    Min: float
+    Close: float
+    Change: float
+    ChangePer: float
+    Volume: float
+    SettlementPrice: float
+    OpenInterest: int
+    TradingSession: str
+    date: str
+
+
+SCHEMAS = {
+    'TaiwanStockPrice': TaiwanStockPrice,
+    'TaiwanFuturesDaily': TaiwanFuturesDaily,
+}
+
+
+# dtypes frames carry from parse to upload: ids are categorical, counts int64, prices float32 like
+# the FLOAT columns of create_table.sql, futures volume stays float64, dates are datetime64
+DTYPE_PLAN = {
+    'TaiwanStockPrice': dict(
+        StockID='category',
+        TradeVolume='int64',
+        Transaction='int64',
+        TradeValue='int64',
+        Open='float32',
+        Max='float32',
+        Min='float32',
+        Close='float32',
+        Change='float32',
+        date='datetime64[ns]',
+    ),
+    'TaiwanFuturesDaily': dict(
+        FuturesID='category',
+        ContractDate='category',
+        Open='float32',
+        Max='float32',
+        Min='float32',
+        Close='float32',
+        Change='float32',
+        ChangePer='float32',
+        Volume='float64',
+        SettlementPrice='float32',
+        OpenInterest='int64',
+        TradingSession='category',
+        date='datetime64[ns]',
+    ),
+}
+
+
+def apply_dtype_plan(df: pd.DataFrame, dataset: str, columns: list[str] = None) -> pd.DataFrame:
+    plan = DTYPE_PLAN[dataset]
+    for col in columns or list(plan):
+        if col not in df.columns or df[col].dtype == plan[col]:
+            continue
+        if plan[col].startswith('datetime64'):
+            df[col] = pd.to_datetime(df[col], format='%Y-%m-%d')
+        else:
+            df[col] = df[col].astype(plan[col])
+    return df
+
+
+class SchemaValidationError(ValueError):
+    def __init__(self, dataset: str, errors: dict[str, list]):
+        self.dataset = dataset
+        self.errors = errors
+        detail = ', '.join(
+            f'{col}: rows {rows[:10]}{"..." if len(rows) > 10 else ""}'
+            for col, rows in errors.items()
+        )
+        super().__init__(f'{dataset} schema check failed, {detail}')
+
+
+def _is_nan_literal(series: pd.Series) -> pd.Series:
+    # pydantic accepts float('nan') and 'nan' for float fields, but not None
+    return series.map(lambda v: isinstance(v, float)).astype(bool) | (
+        series.astype(str).str.strip().str.lower() == 'nan'
+    )
+
+
+def _coerce_str(series: pd.Series) -> tuple[pd.Series, pd.Series]:
+    # planned dtypes: categorical ids and datetime64 dates are kept as they are
+    if isinstance(series.dtype, pd.CategoricalDtype) and (
+        pd.api.types.infer_dtype(series.cat.categories, skipna=False) in ('string', 'empty')
+    ):
+        return series, series.isna()
+    if pd.api.types.is_datetime64_dtype(series):
+        return series, series.isna()
+    if pd.api.types.infer_dtype(series, skipna=False) == 'string':
+        return series.astype(object), pd.Series(False, index=series.index)
+    bad = ~series.map(lambda v: isinstance(v, str))
+    return series.astype(object), bad
+
+
+def _coerce_int(series: pd.Series) -> tuple[pd.Series, pd.Series]:
+    inferred = pd.api.types.infer_dtype(series, skipna=False)
+    if inferred in ('integer', 'string'):
+        try:
+            return series.astype('int64'), pd.Series(False, index=series.index)
+        except (ValueError, TypeError, OverflowError):
+            pass
+    values = pd.to_numeric(series, errors='coerce')
+    bad = ~np.isfinite(values) | (values % 1 != 0)
+    return values.where(~bad, 0).astype('int64'), bad
+
+
+def _coerce_float(series: pd.Series) -> tuple[pd.Series, pd.Series]:
+    inferred = pd.api.types.infer_dtype(series, skipna=False)
+    if inferred in ('floating', 'integer', 'mixed-integer-float', 'string'):
+        try:
+            return series.astype('float64'), pd.Series(False, index=series.index)
+        except (ValueError, TypeError):
+            pass
+    values = pd.to_numeric(series, errors='coerce')
+    bad = values.isna().to_numpy()
+    if bad.any():
+        bad[bad] = ~_is_nan_literal(series[bad]).to_numpy(dtype=bool)
+    return values.astype('float64'), pd.Series(bad, index=series.index)
+
+
+COERCE = {
+    str: _coerce_str,
+    int: _coerce_int,
+    float: _coerce_float,
+}
+
+
+def check_schema_by_row(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
     df_dict = df.to_dict('records')
-    schema = getattr(importlib.import_module('financial_data.schema.dataset'), dataset)
+    schema = SCHEMAS[dataset]
     df_schema = [
         schema(**dd).__dict__
         for dd in df_dict
     ]
     df = pd.DataFrame(df_schema)
-    return df
\ No newline at end of file
+    return df
+
+
+def check_schema(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    if len(df) == 0:
+        return pd.DataFrame()
+    schema = SCHEMAS[dataset]
+    columns = {}
+    errors = {}
+    for name, field in schema.model_fields.items():
+        if name not in df.columns:
+            errors[name] = list(df.index)
+            continue
+        values, bad = COERCE[field.annotation](df[name])
+        if bad.any():
+            errors[name] = list(df.index[bad.to_numpy()])
+        columns[name] = values.array
+    if errors:
+        raise SchemaValidationError(dataset=dataset, errors=errors)
+    df = pd.DataFrame(columns)
+    if dataset in DTYPE_PLAN:
+        df = apply_dtype_plan(df=df, dataset=dataset)
+    return df
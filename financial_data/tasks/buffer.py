@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+import typing
+from collections import defaultdict
+from concurrent.futures import Future
+from financial_data.config import WRITE_BEHIND_INTERVAL, WRITE_BEHIND_ROWS
+from loguru import logger
+
+import pandas as pd
+
+# upload(frames=[(parameter, df), ...], dataset=..., table=...) -> rows
+Upload = typing.Callable[..., int]
+Pending = dict[tuple[str, str], list[tuple[dict[str, str], pd.DataFrame, Future]]]
+
+
+class WriteBehindBuffer:
+    # frames of many tasks in this worker wait here and go out as one upsert per (dataset, table)
+    def __init__(
+        self,
+        upload: Upload,
+        max_rows: int = WRITE_BEHIND_ROWS,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        max_frames: int = 1,
+    ):
+        self.upload = upload
+        self.max_rows = max_rows
+        self.interval = interval
+        # callers block on their future, so no more frames than pool slots can ever be waiting
+        self.max_frames = max_frames
+        self.pending: Pending = defaultdict(list)
+        self.frames = self.rows = 0
+        self.since = None
+        self.condition = threading.Condition()
+        # held from taking a batch until it is written, so flush can wait for the one in flight
+        self.writing = threading.Lock()
+        self.thread = None
+
+    def add(self, dataset: str, table: str, parameter: dict[str, str], df: pd.DataFrame) -> Future:
+        # the future resolves once the flush carrying this frame has committed
+        future = Future()
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='write-behind', daemon=True)
+                self.thread.start()
+            self.pending[(dataset, table)].append((parameter, df, future))
+            self.frames += 1
+            self.rows += len(df)
+            if self.since is None:
+                self.since = time.monotonic()
+            self.condition.notify()
+        return future
+
+    def is_due(self) -> bool:
+        return self.since is not None and (
+            self.frames >= self.max_frames or self.rows >= self.max_rows or time.monotonic() - self.since >= self.interval
+        )
+
+    def take(self) -> Pending:
+        pending = self.pending
+        self.pending = defaultdict(list)
+        self.frames = self.rows = 0
+        self.since = None
+        return pending
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.is_due():
+                    timeout = None if self.since is None else self.interval - (time.monotonic() - self.since)
+                    self.condition.wait(timeout=timeout)
+            with self.writing:
+                with self.condition:
+                    pending = self.take()
+                self.write(pending)
+
+    def write(self, pending: Pending):
+        for (dataset, table), items in pending.items():
+            try:
+                rows = self.upload(frames=[(parameter, df) for parameter, df, _ in items], dataset=dataset, table=table)
+            except Exception as e:
+                logger.info(f'write-behind {dataset} {len(items)} frames error: {e}')
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+            logger.info(f'write-behind {dataset}: {len(items)} frames, {rows} rows')
+            for _, df, future in items:
+                future.set_result(len(df))
+
+    def flush(self):
+        # returns once every frame added before it is written, including a batch the thread already took
+        with self.writing:
+            with self.condition:
+                pending = self.take()
+            self.write(pending)
+
+
+_buffer: typing.Optional[WriteBehindBuffer] = None
+# prefork children run one task at a time and keep 1, the threads pool raises it to its thread count
+_concurrency = 1
+
+
+def get_buffer(upload: Upload) -> WriteBehindBuffer:
+    global _buffer
+    if _buffer is None:
+        _buffer = WriteBehindBuffer(upload=upload, max_frames=_concurrency)
+    return _buffer
+
+
+def set_concurrency(concurrency: int):
+    global _concurrency
+    _concurrency = max(concurrency, 1)
+    if _buffer is not None:
+        _buffer.max_frames = _concurrency
+
+
+def flush():
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def _reset_after_fork():
+    # the flushing thread does not survive a fork, a child starts with its own buffer
+    global _buffer
+    _buffer = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
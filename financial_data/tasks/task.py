@@ -1,11 +1,112 @@
-import importlib
-from financial_data.backend import db
+import pandas as pd
+from financial_data import metrics, profiling, registry
+from financial_data.backend import db, sink
+from financial_data.config import CRAWLER_BATCH_UPLOAD_ROWS, WRITE_BEHIND_ENABLED
+from financial_data.schema.dataset import apply_dtype_plan
+from financial_data.tasks import buffer
 from financial_data.tasks.worker import app
+from loguru import logger
 
-@app.task()
+# acked after the task returns, which is after its rows are committed; requeued if the worker dies first
+@app.task(acks_late=True, reject_on_worker_lost=True)
 def crawler(dataset: str, parameter: dict[str, str]):
-    df = getattr(
-        importlib.import_module(f'financial_data.crawler.{dataset}'),
-        'crawler'
-    )(parameter=parameter)
-    db.upload_data(df, dataset, db.router.mysql_financial_data_conn)
\ No newline at end of file
+    spec = registry.get_dataset(dataset)
+    with profiling.profile(dataset=dataset, parameter=parameter):
+        df = spec.crawler(parameter=parameter)
+        if len(df) == 0:
+            return
+        if WRITE_BEHIND_ENABLED:
+            buffer.get_buffer(upload=upload_frames).add(
+                dataset=dataset, table=spec.table, parameter=parameter, df=df
+            ).result()
+        else:
+            upload_frames(frames=[(parameter, df)], dataset=dataset, table=spec.table)
+
+def upload_frames(frames: list[tuple[dict[str, str], pd.DataFrame]], dataset: str, table: str) -> int:
+    if not frames:
+        return 0
+    rows = 0
+    with db.router.mysql_financial_data_connect() as mysql_conn:
+        for data_source in {parameter.get('data_source', '') for parameter, _ in frames}:
+            df = pd.concat(
+                [df for parameter, df in frames if parameter.get('data_source', '') == data_source],
+                ignore_index=True,
+            )
+            # categoricals with different categories concat to object, restore the planned dtypes
+            df = apply_dtype_plan(df=df, dataset=table)
+            with metrics.labels(dataset=table, data_source=data_source):
+                with metrics.stage('upload'):
+                    df = sink.upload(df=df, table=table, data_source=data_source)
+                metrics.count_rows(stage='upload', rows=len(df))
+            # a date whose rows were all rejected stays uncovered and is planned again
+            db.record_coverage(df, dataset, data_source, mysql_conn)
+            rows += len(df)
+    return rows
+
+def upload_behind(
+    frames: list[tuple[dict[str, str], pd.DataFrame]], dataset: str, table: str, failed: list[dict[str, str]]
+) -> int:
+    # frames join the worker's write-behind buffer, the task waits for the flushes that carry them
+    write_behind = buffer.get_buffer(upload=upload_frames)
+    futures = [
+        (parameter, write_behind.add(dataset=dataset, table=table, parameter=parameter, df=df))
+        for parameter, df in frames
+    ]
+    rows = 0
+    for parameter, future in futures:
+        try:
+            rows += future.result()
+        except Exception as e:
+            logger.info(f'{dataset}, {parameter} upload error: {e}')
+            failed.append(parameter)
+    return rows
+
+def upload_batch(
+    frames: list[tuple[dict[str, str], pd.DataFrame]], dataset: str, table: str, failed: list[dict[str, str]]
+) -> int:
+    # a failed upload fails the parameters it carried, not the task, so the chord callback still reports them
+    if WRITE_BEHIND_ENABLED:
+        return upload_behind(frames=frames, dataset=dataset, table=table, failed=failed)
+    try:
+        return upload_frames(frames=frames, dataset=dataset, table=table)
+    except Exception as e:
+        logger.info(f'{dataset} upload of {len(frames)} parameters error: {e}')
+        failed.extend(parameter for parameter, _ in frames)
+        return 0
+
+# like crawler, acked once every upload of the chunk has returned; a chunk lost with its worker is crawled again
+@app.task(acks_late=True, reject_on_worker_lost=True)
+def crawler_batch(dataset: str, parameter_list: list[dict[str, str]]) -> dict:
+    spec = registry.get_dataset(dataset)
+    if not parameter_list:
+        return dict(parameters=0, rows=0, failed=[])
+    # the chunk is fetched concurrently, each host still paced by its token bucket; one profile covers the chunk
+    last = parameter_list[-1]
+    span = dict(parameter_list[0], end_date=last.get('end_date', last.get('date', '')))
+    with profiling.profile(dataset=dataset, parameter=span):
+        crawled, failed = spec.crawler_many(parameter_list=parameter_list)
+    frames = []
+    buffered = rows = 0
+    for parameter, df in crawled:
+        if len(df) == 0:
+            continue
+        frames.append((parameter, df))
+        buffered += len(df)
+        if buffered >= CRAWLER_BATCH_UPLOAD_ROWS:
+            rows += upload_batch(frames=frames, dataset=dataset, table=spec.table, failed=failed)
+            frames = []
+            buffered = 0
+    rows += upload_batch(frames=frames, dataset=dataset, table=spec.table, failed=failed)
+    return dict(parameters=len(parameter_list), rows=rows, failed=failed)
+
+@app.task()
+def crawler_report(results: list[dict], dataset: str, data_source: str):
+    parameters = sum(result['parameters'] for result in results)
+    rows = sum(result['rows'] for result in results)
+    failed = [parameter for result in results for parameter in result['failed']]
+    logger.info(
+        f'{dataset} {data_source} done: {len(results)} tasks, {parameters} parameters, {rows} rows, {len(failed)} failed'
+    )
+    for parameter in failed:
+        logger.info(f'{dataset} failed: {parameter}')
+    return dict(dataset=dataset, data_source=data_source, parameters=parameters, rows=rows, failed=failed)
@@ -1,10 +1,52 @@
 from celery import Celery
-from financial_data.config import MESSAGE_QUEUE_HOST, MESSAGE_QUEUE_PORT, WORKER_ACCOUNT, WORKER_PASSWORD
+from celery.signals import worker_init, worker_process_shutdown, worker_ready, worker_shutdown
+from financial_data import metrics, registry
+from financial_data.tasks import buffer
+from financial_data.config import (
+    CELERY_RESULT_BACKEND,
+    MESSAGE_QUEUE_HOST,
+    MESSAGE_QUEUE_PORT,
+    METRICS_ENABLED,
+    WORKER_ACCOUNT,
+    WORKER_PASSWORD,
+)
 
 broker = f'pyamqp://{WORKER_ACCOUNT}:{WORKER_PASSWORD}@{MESSAGE_QUEUE_HOST}:{MESSAGE_QUEUE_PORT}/'
 
 app = Celery(
     "task",
-    include=["financial_data.tasks.tasks"],
+    include=["financial_data.tasks.task"],
     broker=broker,
-)
\ No newline at end of file
+    backend=CELERY_RESULT_BACKEND,
+)
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    if METRICS_ENABLED:
+        metrics.start_server()
+
+
+@worker_init.connect
+def preload_datasets(**kwargs):
+    registry.preload()
+
+
+@worker_ready.connect
+def size_write_behind(sender=None, **kwargs):
+    # pool processes are forked before this and keep flushing per task
+    buffer.set_concurrency(sender.controller.concurrency)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_write_behind(**kwargs):
+    # threads pool tasks run in the main process, prefork tasks in pool processes, flush whichever holds rows
+    buffer.flush()
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid: int = None, **kwargs):
+    # drops the live gauges of a recycled pool process, its counters stay in the totals
+    if METRICS_ENABLED:
+        metrics.mark_process_dead(pid)
@@ -4,34 +4,9 @@ import time
 import pandas as pd
 import requests
 from financial_data.backend.db.router import Router
+from financial_data.crawler.taiwan_stock_price import TABLE, clean_data
+from financial_data.schema.dataset import check_schema as check_dataset_schema
 from loguru import logger
-from pydantic import BaseModel
-
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    for col in [
-        'TradeVolume',
-        'Transaction',
-        'TradeValue',
-        'Open',
-        'Max',
-        'Min',
-        'Close',
-        'Change',
-    ]:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(',', '')
-            .str.replace('X', '')
-            .str.replace('+', '')
-            .str.replace('----', '0')
-            .str.replace('---', '0')
-            .str.replace('--', '0')
-            .str.replace('除權息', '0')
-            .str.replace('除息', '0')
-            .str.replace('除權', '0')
-        )
-    return df
 
 def set_column(df: pd.DataFrame) -> pd.DataFrame:
 
@@ -89,26 +64,8 @@ def crawler_tpex(date: str) -> pd.DataFrame:
     df['date'] = date
     return df
 
-class TaiwanStockPrice(BaseModel):
-    StockID: str
-    TradeVolume: int
-    Transaction: int
-    TradeValue: int
-    Open: float
-    Max: float
-    Min: float
-    Close: float
-    Change: float
-    date: str
-
 def check_schema(df: pd.DataFrame) -> pd.DataFrame:
-    df_dict = df.to_dict('records')
-    df_schema = [
-        TaiwanStockPrice(**dd).__dict__
-        for dd in df_dict
-    ]
-    df = pd.DataFrame(df_schema)
-    return df
+    return check_dataset_schema(df=df, dataset=TABLE)
 
 def gen_date_list(start_date: str, end_date: str) -> list[str]:
     start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
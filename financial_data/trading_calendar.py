@@ -0,0 +1,75 @@
+import datetime
+import fcntl
+import json
+import os
+import sys
+import typing
+from financial_data.config import TRADING_CALENDAR_DIR
+from loguru import logger
+
+# exchange -> (mtime, closed days), reloaded when another process updates the file
+_closed_days: dict[str, tuple[float, set[str]]] = {}
+
+
+def get_calendar_path(exchange: str) -> str:
+    return os.path.join(TRADING_CALENDAR_DIR, f'{exchange}.json')
+
+
+def load_closed_days(exchange: str) -> set[str]:
+    path = get_calendar_path(exchange=exchange)
+    if not os.path.exists(path):
+        return set()
+    mtime = os.path.getmtime(path)
+    cached = _closed_days.get(exchange)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        raw = f.read()
+    days = set(json.loads(raw)) if raw else set()
+    _closed_days[exchange] = (mtime, days)
+    return days
+
+
+def add_closed_days(exchange: str, dates: typing.Iterable[str]):
+    os.makedirs(TRADING_CALENDAR_DIR, exist_ok=True)
+    with open(get_calendar_path(exchange=exchange), 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        raw = f.read()
+        days = set(json.loads(raw)) if raw else set()
+        new_days = set(dates) - days
+        if not new_days:
+            return
+        f.seek(0)
+        f.truncate()
+        json.dump(sorted(days | new_days), f)
+    _closed_days.pop(exchange, None)
+
+
+def mark_closed(exchange: str, date: str):
+    # an empty answer for today may only mean the data is not published yet
+    if date < str(datetime.date.today()):
+        logger.info(f'{exchange} {date} has no data, marked as closed')
+        add_closed_days(exchange=exchange, dates=[date])
+
+
+def is_closed(exchange: str, date: str) -> bool:
+    return date in load_closed_days(exchange=exchange)
+
+
+def seed_holidays(exchange: str, path: str):
+    # one date per line, YYYY-MM-DD or YYYY/MM/DD
+    with open(path) as f:
+        dates = [
+            line.strip().replace('/', '-')
+            for line in f
+            if line.strip() and not line.startswith('#')
+        ]
+    add_closed_days(exchange=exchange, dates=dates)
+    logger.info(f'{exchange} seeded {len(dates)} holidays from {path}')
+
+
+if __name__ == '__main__':
+    exchange, path = sys.argv[1:]
+    seed_holidays(exchange=exchange, path=path)
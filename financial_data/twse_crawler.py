@@ -5,49 +5,15 @@ import time
 import pandas as pd
 import requests
 from loguru import logger
-from pydantic import BaseModel
 
 from .backend.db.router import Router
+from .backend.http.fetch import Response
+from .crawler.taiwan_stock_price import TABLE, clean_data as clean_stock_price, convert_change, parse_twse
+from .schema.dataset import check_schema as check_dataset_schema
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    df['Dir'] = ( 
-        df['Dir']
-        .str.split('>')
-        .str[1]
-        .str.split('<')
-        .str[0]
-    )
-    df['Change'] = (
-        df['Dir'] + df['Change']
-    )
-    df['Change'] = (
-        df['Change']
-        .str.replace(' ', '')
-        .str.replace('X', '')
-        .astype(float)
-    )
-    df = df.fillna('')
-    df = df.drop(['Dir'], axis=1)
-    for col in [
-        'TradeVolume',
-        'Transaction',
-        'TradeValue',
-        'Open',
-        'Max',
-        'Min',
-        'Close',
-        'Change',
-    ]:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace(',', '')
-            .str.replace('X', '')
-            .str.replace('+', '')
-            .str.replace('----', '0')
-            .str.replace('---', '0')
-            .str.replace('--', '0')
-        )
+    df = convert_change(df)
+    df = clean_stock_price(df)
     return df
 
 def transfer_colname_zh2en(df: pd.DataFrame, colname: list[str]) -> pd.DataFrame:
@@ -99,45 +65,10 @@ def crawler_twse(date: str) -> pd.DataFrame:
         url=url, 
         headers=get_twse_headers()
     )
-    
-    try:
-        if res.json()['stat'] in ['查詢日期小於93年2月11日，請重新查詢!', '很抱歉，沒有符合條件的資料!']:
-            return pd.DataFrame
-        else:
-            df = pd.DataFrame(
-                res.json()['tables'][8]['data']
-            )
-            colname = res.json()['tables'][8]['fields']
-    except BaseException:
-        return pd.DataFrame
-    
-    if len(df) == 0:
-        return pd.DataFrame
-    
-    df = transfer_colname_zh2en(df.copy(), colname)
-    df['date'] = date
-    return df
-
-class TaiwanStockPrice(BaseModel):
-    StockID: str
-    TradeVolume: int
-    Transaction: int
-    TradeValue: int
-    Open: float
-    Max: float
-    Min: float
-    Close: float
-    Change: float
-    date: str
+    return parse_twse(res=Response(url=url, status=res.status_code, content=res.content), date=date)
 
 def check_schema(df: pd.DataFrame) -> pd.DataFrame:
-    df_dict = df.to_dict('records')
-    df_schema = [
-        TaiwanStockPrice(**dd).__dict__
-        for dd in df_dict
-    ]
-    df = pd.DataFrame(df_schema)
-    return df
+    return check_dataset_schema(df=df, dataset=TABLE)
 
 def gen_date_list(start_date: str, end_date: str) -> list[str]:
     start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()